@@ -0,0 +1,162 @@
+import numpy as np
+
+from weather_codes import weather_codes
+
+# 整数の列の欠損値
+MISSING = -1
+TEMP_MISSING = -128
+
+# 予報JSONの1つの値が1行になる（値のない列は欠損値）
+COLUMN_DTYPES = {
+    "doc": "int32",          # parse_forecasts に渡したリストの何番目か
+    "report": "int8",        # 0: 短期予報, 1: 週間予報
+    "area_code": "U6",
+    "time": "datetime64[s]",  # 日本時間
+    "weather_code": "int16",
+    "weather": "object",
+    "wind": "object",
+    "pop": "int8",
+    "temp_min": "int8",
+    "temp_max": "int8",
+}
+
+
+def _to_int(value, missing):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return missing
+
+
+class ForecastTable:
+    """天気予報JSONを列ごとのNumPy配列にまとめたもの
+
+    地域や日付での絞り込みは真偽値の配列で一度に行う。
+    """
+
+    def __init__(self, columns):
+        self.columns = columns
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def __len__(self):
+        return len(self.columns["doc"])
+
+    def filter(self, mask):
+        return ForecastTable({name: values[mask] for name, values in self.columns.items()})
+
+    def to_frame(self):
+        """pandasのDataFrameにする（分析用）"""
+        import pandas as pd
+
+        return pd.DataFrame(self.columns, copy=False)
+
+
+def parse_forecasts(documents):
+    """複数の天気予報JSONを1回の走査で ForecastTable に変換する"""
+    columns = {name: [] for name in COLUMN_DTYPES}
+    for doc, weather_data in enumerate(documents):
+        for report, forecast in enumerate(weather_data):
+            # 気温はアメダス地点のコード（例: 44132）で出るので、同じ順に並んでいる
+            # 最初の時系列の区域（一次細分区域）のコードに置き換える
+            series_list = forecast["timeSeries"]
+            area_codes = [area["area"]["code"] for area in series_list[0]["areas"]] if series_list else []
+            for series in series_list:
+                # "2024-01-01T17:00:00+09:00" の時差部分を除いて日本時間として扱う
+                times = [time[:19] for time in series["timeDefines"]]
+                for i, area in enumerate(series["areas"]):
+                    n = len(times)
+                    code = area["area"]["code"]
+                    if _is_temperature(area) and i < len(area_codes):
+                        code = area_codes[i]
+                    # 短期予報の temps は 0時が最低気温、9時が最高気温
+                    temps = area.get("temps", [])
+                    temps_min = area.get("tempsMin") or [t if time[11:13] == "00" else "" for time, t in zip(times, temps)]
+                    temps_max = area.get("tempsMax") or [t if time[11:13] != "00" else "" for time, t in zip(times, temps)]
+
+                    columns["doc"] += [doc] * n
+                    columns["report"] += [report] * n
+                    columns["area_code"] += [code] * n
+                    columns["time"] += times
+                    columns["weather_code"] += _padded(area.get("weatherCodes"), n, MISSING, as_int=True)
+                    columns["weather"] += _padded(area.get("weathers"), n, None)
+                    columns["wind"] += _padded(area.get("winds"), n, None)
+                    columns["pop"] += _padded(area.get("pops"), n, MISSING, as_int=True)
+                    columns["temp_min"] += _padded(temps_min, n, TEMP_MISSING, as_int=True)
+                    columns["temp_max"] += _padded(temps_max, n, TEMP_MISSING, as_int=True)
+
+    return ForecastTable({
+        name: np.array(values, dtype=COLUMN_DTYPES[name]) for name, values in columns.items()
+    })
+
+
+def _is_temperature(area):
+    return "temps" in area or "tempsMin" in area or "tempsMax" in area
+
+
+def _padded(values, n, missing, as_int=False):
+    """時刻の数に合わせて値のリストを切り詰め・補う（空文字は欠損値にする）"""
+    values = list(values or [])[:n]
+    if as_int:
+        values = [_to_int(value, missing) for value in values]
+    else:
+        values = [value or missing for value in values]
+    return values + [missing] * (n - len(values))
+
+
+def forecast_rows(table, area_code, doc=0):
+    """短期予報から、指定した地域の日付ごとの予報を WeatherRepository.save_forecasts の形式で返す
+
+    最高・最低気温は短期予報の気温を使い、ない日は週間予報の tempsMax / tempsMin で補う。
+    """
+    in_doc = table["doc"] == doc
+    in_area = in_doc & (table["area_code"] == area_code)
+    area = table.filter(in_area & (table["report"] == 0))
+    forecasts = area.filter(np.not_equal(area["weather"], None))
+    if not len(forecasts):
+        return []
+
+    # 降水確率は6時間ごとなので日付でまとめる
+    pops = area.filter(area["pop"] != MISSING)
+    pop_dates = pops["time"].astype("datetime64[D]").astype(str).tolist()
+    pop_times = np.char.add(np.datetime_as_string(pops["time"]), "+09:00").tolist()
+    pops_by_date = {}
+    for date, time, pop in zip(pop_dates, pop_times, pops["pop"].tolist()):
+        pops_by_date.setdefault(date, []).append((time, str(pop)))
+
+    dates = forecasts["time"].astype("datetime64[D]").astype(str).tolist()
+    weathers = forecasts["weather"].tolist()
+    # 天気コードは予報JSONの weatherCodes を使い、ないものだけ天気の文からまとめて求める
+    codes = [str(code) if code != MISSING else None for code in forecasts["weather_code"].tolist()]
+    missing = [i for i, code in enumerate(codes) if code is None]
+    if missing:
+        for i, code in zip(missing, weather_codes([weathers[i] for i in missing])):
+            codes[i] = code
+    # 気温は天気とは別の時刻（0時・9時）の行にあるので日付でまとめる
+    weekly = table.filter(in_area & (table["report"] == 1))
+    max_by_date = {**_temps_by_date(weekly, "temp_max"), **_temps_by_date(area, "temp_max")}
+    min_by_date = {**_temps_by_date(weekly, "temp_min"), **_temps_by_date(area, "temp_min")}
+    max_temps = [max_by_date.get(date, TEMP_MISSING) for date in dates]
+    min_temps = [min_by_date.get(date, TEMP_MISSING) for date in dates]
+    winds = forecasts["wind"].tolist()
+
+    return [
+        {
+            "date": date,
+            "weather": weather,
+            "weather_code": code,
+            "max_temp": str(max_temp) if max_temp != TEMP_MISSING else None,
+            "min_temp": str(min_temp) if min_temp != TEMP_MISSING else None,
+            "wind": wind or "",
+            "pops": pops_by_date.get(date, []),
+        }
+        for date, weather, code, max_temp, min_temp, wind in zip(dates, weathers, codes, max_temps, min_temps, winds)
+    ]
+
+
+def _temps_by_date(rows, column):
+    """気温のある行だけを、日付 -> 気温 の辞書にする"""
+    rows = rows.filter(rows[column] != TEMP_MISSING)
+    dates = rows["time"].astype("datetime64[D]").astype(str).tolist()
+    return dict(zip(dates, rows[column].tolist()))
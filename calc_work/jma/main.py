@@ -1,27 +1,45 @@
 import flet as ft
 import requests
 
+from forecast_table import forecast_rows, parse_forecasts
+from jma_cache import JsonCache, forecast_expires_at
+from jma_client import JmaClient
+
 # APIエンドポイントの定義
-AREA_URL = "http://www.jma.go.jp/bosai/common/const/area.json"
+AREA_URL = "https://www.jma.go.jp/bosai/common/const/area.json"
 WEATHER_URL = "https://www.jma.go.jp/bosai/forecast/data/forecast/{area_code}.json"
 
+# 気象庁APIへの接続はこのクライアントで使い回す
+client = JmaClient()
+
+# 天気予報のキャッシュ
+CACHE_DIR = 'jma_cache'
+api_cache = JsonCache(CACHE_DIR, client)
+
 def fetch_area_list():
     try:
-        response = requests.get(AREA_URL)
-        response.raise_for_status()
-        return response.json()
+        return client.get_json(AREA_URL)
     except requests.RequestException as e:
         print(f"地域リストの取得に失敗: {e}")
         return None
 
 def fetch_weather(area_code):
+    """天気予報と、期限切れのキャッシュか を返す（取得できなければ (None, False)）
+
+    データベースを持たないので、気象庁に接続できないときは期限切れのキャッシュでも表示に使う。
+    """
     try:
-        response = requests.get(WEATHER_URL.format(area_code=area_code))
-        response.raise_for_status()
-        return response.json()
+        weather_data, stale = api_cache.fetch(
+            f"forecast_{area_code}",
+            WEATHER_URL.format(area_code=area_code),
+            expires=forecast_expires_at,
+        )
     except requests.RequestException as e:
         print(f"天気情報の取得に失敗 (地域コード: {area_code}): {e}")
-        return None
+        return None, False
+    if stale:
+        print(f"天気情報の取得に失敗 (地域コード: {area_code}): 前回取得した予報を表示します")
+    return weather_data, stale
 
 def find_matching_area(area_data, weather_data, target_name):
     for series in weather_data[0]["timeSeries"]:
@@ -73,35 +91,16 @@ def main(page: ft.Page):
         page.update()
 
     def show_weather(e, region_code, region_name):
-        weather_data = fetch_weather(region_code)
+        weather_data, stale = fetch_weather(region_code)
         area_data = fetch_area_list()
 
         if not weather_data:
             page.add(ft.Text("天気情報を取得できません", color="red"))
             return
 
-        # 天気コードとアイコンの対応表
-        weather_code_map = {
-            "晴れ": "100",
-            "晴時々曇": "101",
-            "晴一時曇": "102",
-            "晴時々雨": "103",
-            "晴一時雨": "104",
-            "晴時々雪": "105",
-            "晴一時雪": "106",
-            "曇り": "200",
-            "曇時々晴": "201",
-            "曇一時晴": "202",
-            "曇時々雨": "203",
-            "曇一時雨": "204",
-            "曇時々雪": "205",
-            "曇一時雪": "206",
-            "雨": "300",
-            "雪": "400",
-            # 必要に応じて他の天気コードも追加
-        }
-
         weather_info = [ft.Text(f"{region_name}の天気予報", size=20, weight=ft.FontWeight.BOLD)]
+        if stale:
+            weather_info.append(ft.Text("最新の予報を取得できないため、前回取得した予報を表示しています", color="orange"))
 
         matching_area, time_defines = find_matching_area(area_data, weather_data, region_name)
 
@@ -109,51 +108,40 @@ def main(page: ft.Page):
             # 日付ごとの天気情報をカードで表示
             weather_cards = []
             
-            if "weathers" in matching_area:
-                for time, weather in zip(time_defines, matching_area.get("weathers", [])):
-                    # 最高気温と最低気温を取得
-                    max_temp = ""
-                    min_temp = ""
-                    if "tempsMax" in matching_area:
-                        max_temp = matching_area["tempsMax"][time_defines.index(time)]
-                    if "tempsMin" in matching_area:
-                        min_temp = matching_area["tempsMin"][time_defines.index(time)]
-
-                    # 天気コードを取得
-                    weather_code = "100"  # デフォルト
-                    for key, code in weather_code_map.items():
-                        if key in weather:
-                            weather_code = code
-                            break
-
-                    # 日付のフォーマット
-                    date = time.split("T")[0]
-
-                    # カードの作成
-                    card = ft.Card(
-                        content=ft.Container(
-                            content=ft.Column(
-                                [
-                                    ft.Text(date, size=16, weight=ft.FontWeight.BOLD),
-                                    ft.Image(
-                                        src=f"https://www.jma.go.jp/bosai/forecast/img/{weather_code}.svg",
-                                        width=50,
-                                        height=50,
-                                    ),
-                                    ft.Text(weather),
-                                    ft.Text(
-                                        f"{min_temp}°C / {max_temp}°C" if min_temp and max_temp else "",
-                                        color=ft.colors.BLUE if min_temp else None
-                                    ),
-                                ],
-                                horizontal_alignment=ft.CrossAxisAlignment.CENTER,
-                                spacing=10,
-                            ),
-                            padding=10,
+            # 日付ごとの天気・気温を表にまとめて取り出す（天気コードもまとめて求める）
+            table = parse_forecasts([weather_data])
+            for forecast in forecast_rows(table, matching_area["area"]["code"]):
+                date = forecast["date"]
+                weather = forecast["weather"]
+                weather_code = forecast["weather_code"]
+                max_temp = forecast["max_temp"] or ""
+                min_temp = forecast["min_temp"] or ""
+
+                # カードの作成
+                card = ft.Card(
+                    content=ft.Container(
+                        content=ft.Column(
+                            [
+                                ft.Text(date, size=16, weight=ft.FontWeight.BOLD),
+                                ft.Image(
+                                    src=f"https://www.jma.go.jp/bosai/forecast/img/{weather_code}.svg",
+                                    width=50,
+                                    height=50,
+                                ),
+                                ft.Text(weather),
+                                ft.Text(
+                                    f"{min_temp}°C / {max_temp}°C" if min_temp and max_temp else "",
+                                    color=ft.colors.BLUE if min_temp else None
+                                ),
+                            ],
+                            horizontal_alignment=ft.CrossAxisAlignment.CENTER,
+                            spacing=10,
                         ),
-                        width=200,
-                    )
-                    weather_cards.append(card)
+                        padding=10,
+                    ),
+                    width=200,
+                )
+                weather_cards.append(card)
 
             # カードを横に並べて表示
             page.controls.clear()
@@ -0,0 +1,69 @@
+import argparse
+import os
+import sys
+import time
+
+# Fletを起動せずにデータベースを更新する（cronやコンテナ向け）
+#   python -m jma_week3 refresh --all --concurrency 8 --db weather_forecast.db
+#   python -m jma_week3 refresh 130000 270000
+#   python -m jma_week3 refresh --stored
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m jma_week3", description="気象庁天気予報のデータベースを更新する")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    refresh = commands.add_parser("refresh", help="天気予報を取得してデータベースに保存する")
+    refresh.add_argument("codes", nargs="*", help="予報区（offices）のコード")
+    refresh.add_argument("--all", action="store_true", help="全予報区を更新する")
+    refresh.add_argument("--stored", action="store_true", help="データベースに保存済みの地域を更新する")
+    refresh.add_argument("--concurrency", type=int, default=4, help="同時に取得する数")
+    refresh.add_argument("--db", help="データベースのファイル（省略時は weather_forecast.db）")
+    return parser.parse_args(argv)
+
+
+def refresh(args):
+    import main
+
+    area_index = main.get_area_index()
+    if area_index is None:
+        return 1
+
+    regions = []
+    if args.all:
+        regions += [
+            office
+            for center in area_index.ids["centers"]
+            for office in area_index.children("centers", center)
+        ]
+    if args.stored:
+        regions += main.repo.list_areas()
+    for code in args.codes:
+        name = area_index.name("offices", code)
+        if name is None:
+            print(f"予報区のコードではありません: {code}")
+            return 2
+        regions.append((code, name))
+    regions = list(dict.fromkeys(regions))
+    if not regions:
+        print("更新する地域がありません（--all / --stored / 予報区のコードを指定）")
+        return 2
+
+    started = time.perf_counter()
+    saved = main.save_many_forecasts(regions, max_workers=args.concurrency)
+    print(f"天気予報を更新: {saved}/{len(regions)} 地域 ({time.perf_counter() - started:.1f} 秒)")
+    return 0 if saved == len(regions) else 1
+
+
+def run(argv=None):
+    args = parse_args(argv)
+    if args.db:
+        # main の読み込み時にデータベースを開くので、その前に指定する
+        os.environ["JMA_DB"] = args.db
+    # 同じディレクトリのモジュールを import できるようにする（python -m jma_week3 で実行したとき）
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    return refresh(args)
+
+
+if __name__ == "__main__":
+    sys.exit(run())
@@ -0,0 +1,299 @@
+import codecs
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+import requests
+
+from jma_cache import JST
+
+# アメダスの観測値（10分ごと、約1300地点）
+AMEDAS_LATEST_URL = "https://www.jma.go.jp/bosai/amedas/data/latest_time.txt"
+AMEDAS_MAP_URL = "https://www.jma.go.jp/bosai/amedas/data/map/{time}.json"
+AMEDAS_POINT_URL = "https://www.jma.go.jp/bosai/amedas/data/point/{station}/{date}_{block:02d}.json"
+
+AMEDAS_DB_PATH = 'amedas.db'
+AMEDAS_INTERVAL = timedelta(minutes=10)
+# 観測時刻から気象庁側で公開されるまでの待ち時間
+AMEDAS_DELAY = timedelta(minutes=2)
+CHUNK_SIZE = 16 * 1024
+
+# JSONのキーと列名（値は [観測値, 品質フラグ] の組で届く）
+AMEDAS_FIELDS = (
+    ("temp", "temp", "REAL"),
+    ("humidity", "humidity", "INTEGER"),
+    ("pressure", "pressure", "REAL"),
+    ("normalPressure", "normal_pressure", "REAL"),
+    ("precipitation10m", "precipitation_10m", "REAL"),
+    ("precipitation1h", "precipitation_1h", "REAL"),
+    ("precipitation24h", "precipitation_24h", "REAL"),
+    ("windDirection", "wind_direction", "INTEGER"),
+    ("wind", "wind", "REAL"),
+    ("sun10m", "sun_10m", "REAL"),
+    ("sun1h", "sun_1h", "REAL"),
+    ("snow", "snow", "INTEGER"),
+)
+COLUMNS = ("station_id", "observed_at") + tuple(column for _, column, _ in AMEDAS_FIELDS)
+
+# 月ごとに1つのテーブルに分ける（observed_at は YYYYMMDDHHMM の整数）
+# 主キーで地点ごとの時系列を、カバリングインデックスでその時刻の全地点を
+# テーブル本体を読まずに取り出せる
+PARTITION_SCHEMA_SQL = '''
+    CREATE TABLE IF NOT EXISTS {table} (
+        station_id INTEGER NOT NULL,
+        observed_at INTEGER NOT NULL,
+        {columns},
+        PRIMARY KEY (station_id, observed_at)
+    ) WITHOUT ROWID
+'''
+
+PARTITION_INDEX_SQL = '''
+    CREATE INDEX IF NOT EXISTS idx_{table}_time
+        ON {table} (observed_at, station_id, temp, precipitation_1h, wind, wind_direction)
+'''
+
+INSERT_SQL = 'INSERT OR REPLACE INTO {table} ({columns}) VALUES ({placeholders})'
+
+SELECT_TIME_SQL = '''
+    SELECT station_id, temp, precipitation_1h, wind, wind_direction
+    FROM {table} WHERE observed_at = ? ORDER BY station_id
+'''
+
+SELECT_STATION_SQL = '''
+    SELECT {columns} FROM {table}
+    WHERE station_id = ? AND observed_at >= ? AND observed_at < ?
+    ORDER BY observed_at
+'''
+
+COUNT_TIME_SQL = 'SELECT COUNT(*) FROM {table} WHERE observed_at = ?'
+
+
+def iter_object_items(chunks):
+    """JSONオブジェクト {"キー": 値, ...} を、届いたバイト列から順に (キー, 値) として取り出す
+
+    全体を読み終わるのを待たず、1項目分が揃うたびにデコードする。
+    値はオブジェクトか配列であること（アメダスのJSONはどちらも地点・時刻ごとのオブジェクト）。
+    """
+    decoder = json.JSONDecoder()
+    text = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    pos = 0
+    started = False
+
+    def skip(pos):
+        while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+            pos += 1
+        return pos
+
+    for chunk in chunks:
+        buffer = buffer[pos:] + text.decode(chunk)
+        pos = 0
+        if not started:
+            pos = skip(pos)
+            if pos == len(buffer):
+                continue
+            if buffer[pos] != "{":
+                raise ValueError("JSONオブジェクトではありません")
+            pos += 1
+            started = True
+
+        while True:
+            start = pos = skip(pos)
+            if pos < len(buffer) and buffer[pos] == "}":
+                return
+            try:
+                key, pos = decoder.raw_decode(buffer, pos)
+                pos = skip(pos)
+                if pos < len(buffer) and buffer[pos] != ":":
+                    raise ValueError(f"JSONの {pos} 文字目に ':' がありません")
+                value, pos = decoder.raw_decode(buffer, skip(pos + 1))
+            except json.JSONDecodeError:
+                # 項目の途中までしか届いていなければ次のチャンクを待つ
+                pos = start
+                break
+            yield key, value
+
+    raise ValueError("JSONが途中で終わっています")
+
+
+def observation_row(station_id, observed_at, values):
+    """1地点・1時刻の観測値を行に変換する（品質フラグは見ずに値だけを使う）"""
+    row = [int(station_id), observed_at]
+    for key, _, _ in AMEDAS_FIELDS:
+        value = values.get(key)
+        row.append(value[0] if value else None)
+    return row
+
+
+def partition_name(observed_at):
+    return f"amedas_observations_{observed_at // 1000000}"
+
+
+def format_time(observed_at):
+    """YYYYMMDDHHMM の整数を気象庁のURLで使う YYYYMMDDHHMMSS にする"""
+    return f"{observed_at}00"
+
+
+def parse_time(text):
+    """"2024-01-01T12:10:00+09:00" を YYYYMMDDHHMM の整数にする"""
+    return int(datetime.fromisoformat(text.strip()).astimezone(JST).strftime("%Y%m%d%H%M"))
+
+
+class AmedasStore:
+    """アメダスの観測値を月ごとのテーブルにまとめて書き込む"""
+
+    def __init__(self, db_path=AMEDAS_DB_PATH):
+        self._lock = threading.Lock()
+        self.con = sqlite3.connect(db_path, check_same_thread=False)
+        self.con.execute("PRAGMA journal_mode=WAL")
+        self.con.execute("PRAGMA synchronous=NORMAL")
+        self._partitions = set()
+
+    def _partition(self, observed_at):
+        table = partition_name(observed_at)
+        if table not in self._partitions:
+            columns = ",\n        ".join(f"{column} {sql_type}" for _, column, sql_type in AMEDAS_FIELDS)
+            # 書き込み中のトランザクションを確定させないよう executescript は使わない
+            self.con.execute(PARTITION_SCHEMA_SQL.format(table=table, columns=columns))
+            self.con.execute(PARTITION_INDEX_SQL.format(table=table))
+            self._partitions.add(table)
+        return table
+
+    def insert(self, rows, batch_size=2000):
+        """行のイテラブルを、月ごとのテーブルへ1つのトランザクションで書き込む"""
+        inserted = 0
+        with self._lock, self.con:
+            batch = []
+            for row in rows:
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    inserted += self._insert_batch(batch)
+                    batch = []
+            inserted += self._insert_batch(batch)
+        return inserted
+
+    def _insert_batch(self, batch):
+        by_table = {}
+        for row in batch:
+            by_table.setdefault(self._partition(row[1]), []).append(row)
+        for table, table_rows in by_table.items():
+            self.con.executemany(INSERT_SQL.format(
+                table=table, columns=", ".join(COLUMNS), placeholders=", ".join("?" * len(COLUMNS))
+            ), table_rows)
+        return len(batch)
+
+    def has(self, observed_at):
+        """その時刻の観測値が保存済みか"""
+        with self._lock:
+            table = self._partition(observed_at)
+            return self.con.execute(COUNT_TIME_SQL.format(table=table), (observed_at,)).fetchone()[0] > 0
+
+    def at(self, observed_at):
+        """ある時刻の全地点の (地点, 気温, 1時間降水量, 風速, 風向) を返す"""
+        with self._lock:
+            table = self._partition(observed_at)
+            return self.con.execute(SELECT_TIME_SQL.format(table=table), (observed_at,)).fetchall()
+
+    def station_series(self, station_id, start, end):
+        """1地点の [start, end) の観測値を、月をまたいで時刻順に返す"""
+        rows = []
+        month = start // 1000000
+        with self._lock:
+            while month <= (end - 1) // 1000000:
+                table = self._partition(month * 1000000)
+                rows += self.con.execute(
+                    SELECT_STATION_SQL.format(columns=", ".join(COLUMNS), table=table),
+                    (int(station_id), start, end),
+                ).fetchall()
+                month = month + 1 if month % 100 < 12 else (month // 100 + 1) * 100 + 1
+        return rows
+
+    def close(self):
+        with self._lock:
+            self.con.close()
+
+
+class AmedasIngest:
+    """アメダスのJSONをダウンロードしながらデコードし、AmedasStore に一括で書き込む"""
+
+    def __init__(self, client, store):
+        self.client = client
+        self.store = store
+
+    def latest_time(self):
+        response = self.client.get(AMEDAS_LATEST_URL)
+        response.raise_for_status()
+        return parse_time(response.text)
+
+    def _stream(self, url):
+        response = self.client.get(url, stream=True)
+        response.raise_for_status()
+        return response.iter_content(CHUNK_SIZE)
+
+    def ingest_map(self, observed_at):
+        """全地点の観測値（map）を1時刻分取り込み、書き込んだ行数を返す"""
+        chunks = self._stream(AMEDAS_MAP_URL.format(time=format_time(observed_at)))
+        return self.store.insert(
+            observation_row(station, observed_at, values)
+            for station, values in iter_object_items(chunks)
+        )
+
+    def ingest_point(self, station_id, observed_at):
+        """1地点の観測値（point、3時間分）を取り込む（欠けた時刻の補完用）"""
+        day, hour = divmod(observed_at // 100, 100)
+        chunks = self._stream(AMEDAS_POINT_URL.format(station=station_id, date=day, block=hour // 3 * 3))
+        return self.store.insert(
+            observation_row(station_id, int(key[:12]), values)
+            for key, values in iter_object_items(chunks)
+        )
+
+    def ingest_file(self, path, observed_at=None):
+        """保存しておいた map のJSON（ファイル名は YYYYMMDDHHMMSS.json）を取り込む"""
+        observed_at = observed_at or int(os.path.basename(path)[:12])
+        with open(path, "rb") as f:
+            chunks = iter(lambda: f.read(CHUNK_SIZE), b"")
+            return self.store.insert(
+                observation_row(station, observed_at, values)
+                for station, values in iter_object_items(chunks)
+            )
+
+    def ingest_latest(self):
+        """最新の時刻がまだ保存されていなければ取り込む"""
+        observed_at = self.latest_time()
+        if self.store.has(observed_at):
+            return 0
+        started = time.perf_counter()
+        inserted = self.ingest_map(observed_at)
+        print(f"アメダス {observed_at}: {inserted} 地点 ({time.perf_counter() - started:.2f} 秒)")
+        return inserted
+
+    def run_forever(self):
+        """10分ごとの観測に合わせて取り込みを続ける"""
+        while True:
+            try:
+                self.ingest_latest()
+            except requests.RequestException as e:
+                print(f"アメダスの取得に失敗: {e}")
+            now = datetime.now(JST)
+            next_time = now.replace(minute=now.minute // 10 * 10, second=0, microsecond=0) + AMEDAS_INTERVAL
+            time.sleep(max(0, (next_time + AMEDAS_DELAY - datetime.now(JST)).total_seconds()))
+
+
+if __name__ == "__main__":
+    # python amedas.py                   10分ごとに最新の観測値を取り込み続ける
+    # python amedas.py 20240101121000.json ...  保存しておいたJSONを取り込む
+    from jma_client import JmaClient
+
+    store = AmedasStore()
+    with JmaClient() as client:
+        ingest = AmedasIngest(client, store)
+        if len(sys.argv) > 1:
+            for path in sys.argv[1:]:
+                print(f"{path}: {ingest.ingest_file(path)} 行")
+        else:
+            ingest.run_forever()
+    store.close()
@@ -0,0 +1,219 @@
+import sqlite3
+import sys
+from datetime import datetime
+
+from forecast_table import MISSING, TEMP_MISSING
+
+ARCHIVE_DB_PATH = 'weather_archive.db'
+
+# 予報の発表ごとに、地域・日付ごとの1行を整数だけで保存する
+#   report_time   発表時刻 YYYYMMDDHH（日本時間）
+#   area_code     予報区コード（アメダス地点コードは AMEDAS_OFFSET を足す）
+#   forecast_date 予報の日付 YYYYMMDD
+#   weather_code  天気コード / pop 降水確率（その日の最大）/ min_temp, max_temp 気温
+# 整数の主キーで WITHOUT ROWID にすると、小さな整数は1〜3バイトで格納される
+ARCHIVE_SCHEMA_SQL = '''
+    CREATE TABLE IF NOT EXISTS forecast_snapshots (
+        report_time INTEGER NOT NULL,
+        area_code INTEGER NOT NULL,
+        forecast_date INTEGER NOT NULL,
+        weather_code INTEGER,
+        pop INTEGER,
+        min_temp INTEGER,
+        max_temp INTEGER,
+        PRIMARY KEY (report_time, area_code, forecast_date)
+    ) WITHOUT ROWID;
+'''
+
+# 同じ発表を二度取り込んでも行は増えない
+INSERT_SNAPSHOT_SQL = '''
+    INSERT OR IGNORE INTO forecast_snapshots
+        (report_time, area_code, forecast_date, weather_code, pop, min_temp, max_temp)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+'''
+
+SELECT_SNAPSHOTS_SQL = '''
+    SELECT report_time, area_code, forecast_date, weather_code, pop, min_temp, max_temp
+    FROM forecast_snapshots
+    WHERE report_time >= ? AND report_time < ?
+    ORDER BY report_time, area_code, forecast_date
+'''
+
+COLUMNS = ("report_time", "area_code", "forecast_date", "weather_code", "pop", "min_temp", "max_temp")
+
+# 書き出し時の型（欠損は MISSING / TEMP_MISSING で表す）
+COLUMN_DTYPES = {
+    "report_time": "int32",
+    "area_code": "int32",
+    "forecast_date": "int32",
+    "weather_code": "int16",
+    "pop": "int8",
+    "min_temp": "int8",
+    "max_temp": "int8",
+}
+
+# 5桁のアメダス地点コードが6桁の予報区コードと重ならないようにする
+AMEDAS_OFFSET = 1_000_000
+
+
+def encode_area_code(code):
+    return int(code) + AMEDAS_OFFSET if len(code) == 5 else int(code)
+
+
+def decode_area_code(value):
+    return f"{value - AMEDAS_OFFSET:05d}" if value >= AMEDAS_OFFSET else f"{value:06d}"
+
+
+# 予報JSONのキーと行の中の位置（weather_code, pop, min_temp, max_temp の順）
+SNAPSHOT_FIELDS = (("weatherCodes", 0), ("pops", 1), ("tempsMin", 2), ("tempsMax", 3), ("temps", None))
+
+
+def _int_or_none(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def snapshot_rows(weather_data):
+    """気象庁の天気予報JSON（1予報区分）を forecast_snapshots の行に変換する
+
+    短期予報と週間予報の両方を見て、同じ発表・地域・日付の値は先に出てきたものを使う。
+    降水確率は6時間ごとの値のうち最大のものを、その日の降水確率とする。
+    """
+    rows = {}
+    for report in weather_data:
+        report_time = int(datetime.fromisoformat(report["reportDatetime"]).strftime("%Y%m%d%H"))
+        for series in report["timeSeries"]:
+            days = [
+                (int(time[:10].replace("-", "")), time[11:13] == "00")
+                for time in series["timeDefines"]
+            ]
+            for area in series["areas"]:
+                area_code = encode_area_code(area["area"]["code"])
+                for key, index in SNAPSHOT_FIELDS:
+                    for (date, midnight), value in zip(days, area.get(key, [])):
+                        value = _int_or_none(value)
+                        if value is None:
+                            continue
+                        row = rows.setdefault((report_time, area_code, date), [None] * 4)
+                        # 短期予報の temps は 0時が最低気温、9時が最高気温
+                        i = index if index is not None else (2 if midnight else 3)
+                        if i == 1 and row[1] is not None:
+                            row[1] = max(row[1], value)
+                        elif row[i] is None:
+                            row[i] = value
+
+    return [key + tuple(values) for key, values in rows.items()]
+
+
+class ForecastArchive:
+    """天気予報の発表ごとのスナップショットを蓄積し、列ごとの配列として書き出す"""
+
+    def __init__(self, db_path=ARCHIVE_DB_PATH):
+        self.con = sqlite3.connect(db_path)
+        self.con.execute("PRAGMA journal_mode=WAL")
+        self.con.execute("PRAGMA synchronous=NORMAL")
+        self.con.executescript(ARCHIVE_SCHEMA_SQL)
+
+    def append(self, documents):
+        """複数の予報区の天気予報JSONを1つのトランザクションでまとめて追加する"""
+        rows = [row for weather_data in documents for row in snapshot_rows(weather_data)]
+        with self.con:
+            before = self.con.total_changes
+            self.con.executemany(INSERT_SNAPSHOT_SQL, rows)
+            return self.con.total_changes - before
+
+    def columns(self, start=0, end=9999999999):
+        """発表時刻が [start, end) の行を、列名からNumPy配列への辞書で返す"""
+        import numpy as np
+
+        rows = self.con.execute(SELECT_SNAPSHOTS_SQL, (start, end)).fetchall()
+        columns = list(zip(*rows)) if rows else [()] * len(COLUMNS)
+        arrays = {}
+        for name, values in zip(COLUMNS, columns):
+            missing = TEMP_MISSING if name.endswith("_temp") else MISSING
+            arrays[name] = np.array(
+                [missing if value is None else value for value in values], dtype=COLUMN_DTYPES[name]
+            )
+        return arrays
+
+    def export(self, path, start=0, end=9999999999):
+        """期間を区切って .npz または .parquet に書き出し、書き出した行数を返す"""
+        arrays = self.columns(start, end)
+        if path.endswith(".parquet"):
+            # pyarrow（または fastparquet）が必要
+            to_frame(arrays).to_parquet(path, index=False)
+        else:
+            import numpy as np
+
+            np.savez_compressed(path, **arrays)
+        return len(arrays["report_time"])
+
+    def close(self):
+        self.con.close()
+
+
+def to_frame(arrays):
+    """列の辞書をpandasのDataFrameにする（欠損値は pandas の NA になる）"""
+    import pandas as pd
+
+    frame = pd.DataFrame(arrays, copy=False)
+    for name in ("weather_code", "pop"):
+        frame[name] = frame[name].astype(COLUMN_DTYPES[name].capitalize()).mask(frame[name] == MISSING)
+    for name in ("min_temp", "max_temp"):
+        frame[name] = frame[name].astype("Int8").mask(frame[name] == TEMP_MISSING)
+    return frame
+
+
+def load_npz(path):
+    """export で書き出した .npz をDataFrameとして読み込む"""
+    import numpy as np
+
+    with np.load(path) as data:
+        return to_frame({name: data[name] for name in COLUMNS})
+
+
+def archive_all_offices():
+    """全予報区の最新の天気予報を取得してアーカイブに追加する"""
+    from concurrent.futures import ThreadPoolExecutor
+
+    from main import PREFETCH_WORKERS, fetch_area_list, fetch_weather
+
+    area_data = fetch_area_list()
+    if not area_data:
+        return 0
+    codes = [
+        code
+        for center in area_data["centers"].values()
+        for code in center["children"]
+        if code in area_data["offices"]
+    ]
+    with ThreadPoolExecutor(max_workers=PREFETCH_WORKERS) as executor:
+        documents = [data for data in executor.map(fetch_weather, codes) if data]
+
+    archive = ForecastArchive()
+    try:
+        added = archive.append(documents)
+    finally:
+        archive.close()
+    print(f"天気予報のアーカイブ: {len(documents)}/{len(codes)} 地域, {added} 行を追加")
+    return added
+
+
+if __name__ == "__main__":
+    # python archive.py append                       全予報区の最新の予報を追加
+    # python archive.py export 202610.npz 2026100100 2026110100
+    #                                                 発表時刻の範囲を書き出す（.npz / .parquet）
+    command = sys.argv[1] if len(sys.argv) > 1 else "append"
+    if command == "append":
+        archive_all_offices()
+    elif command == "export":
+        path = sys.argv[2]
+        start = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+        end = int(sys.argv[4]) if len(sys.argv) > 4 else 9999999999
+        archive = ForecastArchive()
+        print(f"{path} に {archive.export(path, start, end)} 行を書き出しました")
+        archive.close()
+    else:
+        print(f"不明なコマンド: {command}（append または export）")
@@ -0,0 +1,107 @@
+LEVELS = ("centers", "offices", "class10s", "class15s", "class20s")
+
+
+class AreaIndex:
+    """area.json の地域の階層を配列で持ち、コード・名前から即座に引けるようにする
+
+    area.json ではレベルが違えば同じコードが使われることがある（宗谷地方の
+    offices と class10s はどちらも 011000）ので、地域は (レベル, コード) で指定する。
+    各地域には通し番号を振り、親は parents[i]、子は child_ids[child_start[i]:child_start[i + 1]]。
+    名前と読み（kana）の1文字・2文字ごとの転置索引で部分一致検索を行う。
+    """
+
+    def __init__(self, area_data):
+        self.codes = []
+        self.names = []
+        self.kanas = []
+        self.levels = []
+        self.ids = {level: {} for level in LEVELS}
+
+        parent_codes = []
+        for level_no, level in enumerate(LEVELS):
+            for code, info in area_data.get(level, {}).items():
+                self.ids[level][code] = len(self.codes)
+                self.codes.append(code)
+                self.names.append(info["name"])
+                self.kanas.append(info.get("kana", ""))
+                self.levels.append(level_no)
+                parent_codes.append(info.get("parent"))
+
+        # 親は1つ上のレベルの地域
+        self.parents = [
+            self.ids[LEVELS[level_no - 1]].get(parent, -1) if level_no else -1
+            for level_no, parent in zip(self.levels, parent_codes)
+        ]
+
+        # 子は親の番号順に並べ、親ごとの開始位置を持つ
+        counts = [0] * (len(self.codes) + 1)
+        for parent in self.parents:
+            if parent >= 0:
+                counts[parent + 1] += 1
+        self.child_start = [0] * (len(self.codes) + 1)
+        for i in range(len(self.codes)):
+            self.child_start[i + 1] = self.child_start[i] + counts[i + 1]
+        self.child_ids = [0] * self.child_start[-1]
+        filled = self.child_start[:-1].copy()
+        for i, parent in enumerate(self.parents):
+            if parent >= 0:
+                self.child_ids[filled[parent]] = i
+                filled[parent] += 1
+
+        self.by_name = {}
+        self._grams = {}
+        for i, (name, kana) in enumerate(zip(self.names, self.kanas)):
+            self.by_name.setdefault(name, []).append(i)
+            grams = set()
+            for text in (name, kana):
+                grams.update(text)
+                grams.update(text[j:j + 2] for j in range(len(text) - 1))
+            for gram in grams:
+                self._grams.setdefault(gram, []).append(i)
+
+    def find(self, level, code):
+        """地域の通し番号を返す（なければ -1）"""
+        return self.ids[level].get(code, -1)
+
+    def name(self, level, code):
+        i = self.find(level, code)
+        return self.names[i] if i >= 0 else None
+
+    def children(self, level, code):
+        """子の地域を (コード, 名前) のリストで返す"""
+        i = self.find(level, code)
+        if i < 0:
+            return []
+        return [
+            (self.codes[child], self.names[child])
+            for child in self.child_ids[self.child_start[i]:self.child_start[i + 1]]
+        ]
+
+    def ancestor(self, level, code, target_level):
+        """上位のレベル（offices など）の地域のコードを返す（なければNone）"""
+        i = self.find(level, code)
+        target = LEVELS.index(target_level)
+        while i >= 0 and self.levels[i] > target:
+            i = self.parents[i]
+        return self.codes[i] if i >= 0 and self.levels[i] == target else None
+
+    def codes_for_name(self, name):
+        """名前が完全に一致する地域を (レベル, コード) のリストで返す"""
+        return [(LEVELS[self.levels[i]], self.codes[i]) for i in self.by_name.get(name, [])]
+
+    def search(self, query, level="class20s", limit=20):
+        """名前か読みに query を含む地域を、前方一致するものを先にして (コード, 名前) で返す"""
+        query = query.strip()
+        if not query:
+            return []
+
+        # 最も候補の少ない1文字・2文字の索引から探し、実際に含むかを確かめる
+        grams = [query[j:j + 2] for j in range(len(query) - 1)] or [query]
+        candidates = min((self._grams.get(gram, []) for gram in grams), key=len)
+        level_no = LEVELS.index(level)
+        matches = [
+            i for i in candidates
+            if self.levels[i] == level_no and (query in self.names[i] or query in self.kanas[i])
+        ]
+        matches.sort(key=lambda i: not (self.names[i].startswith(query) or self.kanas[i].startswith(query)))
+        return [(self.codes[i], self.names[i]) for i in matches[:limit]]
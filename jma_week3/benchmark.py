@@ -0,0 +1,183 @@
+import argparse
+import http.server
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import unicodedata
+
+# 天気予報アプリのデータ処理のベンチマーク
+# 気象庁の代わりにローカルのHTTPサーバーから記録済みのJSON（benchmark_data/ の予報と、
+# calc_work/jma/areas.json の地域一覧）を返し、取得・保存・読み出し・表示の各段階と、
+# 全予報区の更新のスループットを計測する。
+#
+#   python benchmark.py                        各処理を20回ずつ
+#   python benchmark.py -n 100 --latency 30    気象庁までの往復30msを想定
+#   python benchmark.py --max-ms 50 --min-rate 100
+#                                              どれかの処理が50msを超えるか、全予報区の更新（キャッシュあり）が
+#                                              100予報区/秒を下回ったら終了コード1（CIなどでの確認用）
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BASE_DIR, "benchmark_data")
+# 地域一覧は calc_work のものを共有する（同じファイルを二重に持たない）
+AREA_PATH = os.path.join(BASE_DIR, os.pardir, "calc_work", "jma", "areas.json")
+# 記録した東京都の予報の一次細分区域コード。他の予報区はこれを置き換えて作る
+TEMPLATE_OFFICE = "130000"
+TEMPLATE_AREAS = (("130010", "東京地方"), ("130020", "伊豆諸島北部"), ("130030", "伊豆諸島南部"), ("130040", "小笠原諸島"))
+
+
+def build_responses():
+    """URLのパスからレスポンスの本文への辞書を作る"""
+    with open(AREA_PATH, "rb") as f:
+        area_body = f.read()
+    with open(os.path.join(DATA_DIR, f"forecast_{TEMPLATE_OFFICE}.json"), encoding="utf-8") as f:
+        template = f.read()
+
+    area_data = json.loads(area_body)
+    responses = {"/area.json": area_body}
+    for office in area_data["offices"]:
+        children = [
+            (code, info["name"]) for code, info in area_data["class10s"].items() if info["parent"] == office
+        ] or [(office, area_data["offices"][office]["name"])]
+        body = template
+        for i, (code, name) in enumerate(TEMPLATE_AREAS):
+            new_code, new_name = children[i % len(children)]
+            body = body.replace(f'"{code}"', f'"{new_code}"').replace(f'"{name}"', f'"{new_name}"')
+        responses[f"/forecast/{office}.json"] = body.encode()
+    return responses
+
+
+def start_stub(responses, latency=0.0):
+    """ETag付きでレスポンスを返すローカルHTTPサーバーを起動する"""
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # ヘッダーと本文が別々に送られても遅延ACKで待たされないようにする
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            if latency:
+                time.sleep(latency)
+            body = responses.get(self.path)
+            if body is None:
+                self.send_response(404)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            etag = f'"{hash(body) & 0xffffffff:x}"'
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("ETag", etag)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def pad(text, width):
+    """全角文字を2桁として、表示幅が width になるよう空白を足す"""
+    used = sum(2 if unicodedata.east_asian_width(char) in "WF" else 1 for char in text)
+    return text + " " * max(0, width - used)
+
+
+def measure(label, func, number, setup=None):
+    """func を number 回実行して、中央値と最小値（ミリ秒）を表示する"""
+    times = []
+    for _ in range(number):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    print(f"{pad(label, 40)} {statistics.median(times) * 1000:>9.3f} {min(times) * 1000:>9.3f}")
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description="天気予報アプリのデータ処理のベンチマーク")
+    parser.add_argument("-n", "--number", type=int, default=20, help="各処理の実行回数")
+    parser.add_argument("--latency", type=float, default=0.0, help="スタブサーバーの応答遅延（ミリ秒）")
+    parser.add_argument("--max-ms", type=float, help="各処理の中央値の上限（ミリ秒）。超えたら終了コード1")
+    parser.add_argument("--min-rate", type=float, help="全予報区の更新（キャッシュあり）の下限（予報区/秒）。下回ったら終了コード1")
+    args = parser.parse_args()
+
+    server = start_stub(build_responses(), args.latency / 1000)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    # データベースとキャッシュは一時ディレクトリに作る（main はカレントディレクトリを使う）
+    os.chdir(tempfile.mkdtemp(prefix="jma_benchmark_"))
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import main as app
+    from forecast_view import ForecastView
+
+    app.AREA_URL = f"{base_url}/area.json"
+    app.WEATHER_URL = base_url + "/forecast/{area_code}.json"
+    app.init_database()
+
+    code, name = TEMPLATE_OFFICE, "東京都"
+    n = args.number
+    print(f"{pad('処理', 40)} {'median ms':>9} {'min ms':>9}")
+    medians = {}
+
+    def measure_step(label, func, setup=None):
+        medians[label] = statistics.median(measure(label, func, n, setup=setup)) * 1000
+
+    measure_step("fetch_area_list（キャッシュなし）", app.fetch_area_list,
+                 setup=lambda: app.api_cache.invalidate("area"))
+    measure_step("fetch_area_list（キャッシュあり）", app.fetch_area_list)
+    measure_step("get_area_index（キャッシュあり）", app.get_area_index)
+
+    key = f"forecast_{code}"
+    measure_step("fetch_weather（キャッシュなし）", lambda: app.fetch_weather(code),
+                 setup=lambda: app.api_cache.invalidate(key))
+    measure_step("fetch_weather（キャッシュあり）", lambda: app.fetch_weather(code))
+
+    weather_data = app.fetch_weather(code)
+    area_index = app.get_area_index()
+    measure_step("find_matching_area", lambda: app.find_matching_area(area_index, weather_data, code))
+    measure_step("save_weather_data", lambda: app.save_weather_data(code, name, weather_data))
+    measure_step("fetch_weather_from_database", lambda: app.fetch_weather_from_database(code))
+
+    weather_info = app.fetch_weather_from_database(code)
+    measure_step("カードの作成（新しい画面）",
+                 lambda: ForecastView(on_back=None).show_forecasts(name, weather_info))
+    view = ForecastView(on_back=None)
+    measure_step("カードの更新（画面を使い回す）", lambda: view.show_forecasts(name, weather_info))
+
+    # 全予報区の更新（キャッシュなし＝すべて取得し直す / キャッシュあり）
+    offices = len(area_index.ids["offices"])
+    rate = None
+    for label, setup in (("キャッシュなし", app.api_cache.invalidate), ("キャッシュあり", None)):
+        times = measure(f"全予報区の更新（{label}）", app.prefetch_all_forecasts, max(1, n // 10), setup=setup)
+        rate = offices / statistics.median(times)
+        print(f"  -> {rate:.1f} 予報区/秒")
+
+    server.shutdown()
+
+    # しきい値を指定したときは、超えたものを表示して終了コードで知らせる
+    failures = []
+    if args.max_ms is not None:
+        failures += [f"{label}: {ms:.3f} ms > {args.max_ms} ms" for label, ms in medians.items() if ms > args.max_ms]
+    if args.min_rate is not None and rate < args.min_rate:
+        failures.append(f"全予報区の更新（キャッシュあり）: {rate:.1f} 予報区/秒 < {args.min_rate} 予報区/秒")
+    for failure in failures:
+        print(f"しきい値を超えました: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,147 @@
+from datetime import datetime, timezone
+
+import flet as ft
+
+from icon_cache import ICON_URL
+
+
+def set_if_changed(control, name, value):
+    """値が変わったときだけ属性を書き換える（変わった属性だけがFletから送信される）"""
+    if getattr(control, name) != value:
+        setattr(control, name, value)
+
+
+def describe_age(fetched_at, now=None):
+    """SQLiteのCURRENT_TIMESTAMP（UTC）から「○分前」のような表記を作る"""
+    if not fetched_at:
+        return "取得日時不明"
+    fetched = datetime.strptime(fetched_at, "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc)
+    minutes = int(((now or datetime.now(timezone.utc)) - fetched).total_seconds() // 60)
+    if minutes < 1:
+        return "1分以内"
+    if minutes < 60:
+        return f"{minutes}分前"
+    if minutes < 24 * 60:
+        return f"{minutes // 60}時間前"
+    return f"{minutes // (24 * 60)}日前"
+
+
+class ForecastCard(ft.Card):
+    """1日分の天気予報カード。中身のコントロールは作り直さずに値だけを更新する"""
+
+    def __init__(self, icons=None):
+        self.icons = icons
+        self.date_text = ft.Text(size=16, weight=ft.FontWeight.BOLD)
+        self.icon = ft.Image(width=50, height=50)
+        self.weather_text = ft.Text()
+        self.temp_text = ft.Text()
+        super().__init__(
+            content=ft.Container(
+                content=ft.Column(
+                    [self.date_text, self.icon, self.weather_text, self.temp_text],
+                    horizontal_alignment=ft.CrossAxisAlignment.CENTER,
+                    spacing=10,
+                ),
+                padding=10,
+            ),
+            width=200,
+        )
+
+    def set_forecast(self, date, weather, max_temp, min_temp, weather_code):
+        set_if_changed(self.date_text, "value", date)
+        if self.icons:
+            for name, value in self.icons.image_props(weather_code).items():
+                set_if_changed(self.icon, name, value)
+        else:
+            set_if_changed(self.icon, "src", ICON_URL.format(weather_code=weather_code))
+        set_if_changed(self.weather_text, "value", weather)
+        set_if_changed(self.temp_text, "value", f"{min_temp}°C / {max_temp}°C" if min_temp and max_temp else "")
+        set_if_changed(self.temp_text, "color", ft.colors.BLUE if min_temp else None)
+
+
+class ForecastView(ft.Column):
+    """天気予報画面
+
+    ページに置いたまま使い回し、地域を切り替えるときは行の差分だけを反映する。
+    カードが足りなければ追加し、余ったカードは非表示にする。
+    icons（IconCache）を渡すと天気アイコンをローカルのアセットから表示する。
+    """
+
+    def __init__(self, on_back, icons=None):
+        self.icons = icons
+        self.title = ft.Text(size=24, weight=ft.FontWeight.BOLD)
+        self.status = ft.Text(color=ft.colors.ORANGE, visible=False)
+        self.cards = ft.Row(scroll=ft.ScrollMode.AUTO, spacing=10)
+        super().__init__(
+            [
+                self.title,
+                self.status,
+                self.cards,
+                ft.ElevatedButton("戻る", on_click=on_back, width=300),
+            ],
+            horizontal_alignment=ft.CrossAxisAlignment.CENTER,
+            spacing=20,
+        )
+
+    def set_status(self, message):
+        """保存済みの予報を表示しているときなどの注意書き（空文字で非表示）"""
+        set_if_changed(self.status, "value", message)
+        set_if_changed(self.status, "visible", bool(message))
+
+    def show_forecasts(self, region_name, weather_info, status=""):
+        """weather_info は (date, weather, max_temp, min_temp, weather_code) のリスト"""
+        set_if_changed(self.title, "value", f"{region_name}の天気予報")
+        self.set_status(status)
+
+        cards = self.cards.controls
+        while len(cards) < len(weather_info):
+            cards.append(ForecastCard(self.icons))
+
+        for card, row in zip(cards, weather_info):
+            card.set_forecast(*row)
+            set_if_changed(card, "visible", True)
+        for card in cards[len(weather_info):]:
+            set_if_changed(card, "visible", False)
+
+
+class CompareView(ft.Column):
+    """複数の地域の天気予報を1つの表で比べる画面（行が地域、列が日付）"""
+
+    def __init__(self, on_back, icons=None):
+        self.icons = icons
+        self.table = ft.DataTable(columns=[ft.DataColumn(ft.Text("地域"))], column_spacing=20)
+        super().__init__(
+            [
+                ft.Text("天気予報の比較", size=24, weight=ft.FontWeight.BOLD),
+                ft.Row([self.table], scroll=ft.ScrollMode.AUTO),
+                ft.ElevatedButton("戻る", on_click=on_back, width=300),
+            ],
+            horizontal_alignment=ft.CrossAxisAlignment.CENTER,
+            spacing=20,
+        )
+
+    def _cell(self, forecast):
+        if forecast is None:
+            return ft.DataCell(ft.Text("-"))
+        _, weather, max_temp, min_temp, weather_code = forecast
+        icon = ft.Image(width=24, height=24)
+        props = self.icons.image_props(weather_code) if self.icons else {"src": ICON_URL.format(weather_code=weather_code)}
+        for name, value in props.items():
+            setattr(icon, name, value)
+        temps = f"{min_temp}°C / {max_temp}°C" if min_temp and max_temp else ""
+        return ft.DataCell(ft.Row([icon, ft.Text(f"{weather} {temps}".strip())], spacing=5))
+
+    def show_comparison(self, regions, forecasts):
+        """regions は [(地域コード, 地域名)]、forecasts は地域コードごとの
+        (date, weather, max_temp, min_temp, weather_code) のリスト"""
+        dates = sorted({row[0] for rows in forecasts.values() for row in rows})
+        self.table.columns = [ft.DataColumn(ft.Text("地域"))] + [
+            ft.DataColumn(ft.Text(date)) for date in dates
+        ]
+        self.table.rows = []
+        for code, name in regions:
+            by_date = {row[0]: row for row in forecasts.get(code, [])}
+            self.table.rows.append(ft.DataRow(
+                [ft.DataCell(ft.Text(name, weight=ft.FontWeight.BOLD))]
+                + [self._cell(by_date.get(date)) for date in dates]
+            ))
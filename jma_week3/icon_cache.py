@@ -0,0 +1,122 @@
+import base64
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from weather_codes import WEATHER_CODES
+
+ICON_URL = "https://www.jma.go.jp/bosai/forecast/img/{weather_code}.svg"
+
+# Fletのアセットディレクトリ（ft.app の assets_dir）と、その中のアイコン置き場
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets")
+ICON_SUBDIR = "icons"
+MANIFEST_NAME = "manifest.json"
+
+
+class IconCache:
+    """気象庁の天気アイコン（SVG）をアセットディレクトリに保存して配信する
+
+    ファイル名は内容のハッシュにするので、同じ絵のアイコンは1ファイルにまとまり、
+    中身が変わればURLも変わる。天気コードとファイル名の対応は manifest.json に持つ。
+    inline=True のときは src_base64 で画像を埋め込む（オフライン用）。
+    """
+
+    def __init__(self, client, assets_dir=ASSETS_DIR, inline=False):
+        self.client = client
+        self.icon_dir = os.path.join(assets_dir, ICON_SUBDIR)
+        self.inline = inline
+        self._lock = threading.Lock()
+        self._prefetching = threading.Lock()
+        self._base64 = {}
+        try:
+            with open(os.path.join(self.icon_dir, MANIFEST_NAME), encoding="utf-8") as f:
+                self.manifest = json.load(f)
+        except (OSError, ValueError):
+            self.manifest = {}
+
+    def _download(self, weather_code):
+        """アイコンを取得する。コード専用のアイコンがなければ同じ系統の代表アイコンを使う"""
+        for code in (weather_code, weather_code[0] + "00"):
+            response = self.client.get(ICON_URL.format(weather_code=code))
+            if response.status_code == 404:
+                continue
+            response.raise_for_status()
+            return response.content
+        return None
+
+    def _save(self, content):
+        filename = f"{hashlib.sha256(content).hexdigest()[:16]}.svg"
+        path = os.path.join(self.icon_dir, filename)
+        if not os.path.exists(path):
+            with open(path, "wb") as f:
+                f.write(content)
+        return filename
+
+    def prefetch(self, codes=WEATHER_CODES, max_workers=4):
+        """まだ保存していない天気コードのアイコンをまとめてダウンロードする
+
+        複数のセッションから同時に呼ばれたときは、最初の1つだけがダウンロードする。
+        """
+        if not self._prefetching.acquire(blocking=False):
+            return 0
+        try:
+            return self._prefetch(codes, max_workers)
+        finally:
+            self._prefetching.release()
+
+    def _prefetch(self, codes, max_workers):
+        missing = [code for code in codes if code not in self.manifest]
+        if not missing:
+            return 0
+        os.makedirs(self.icon_dir, exist_ok=True)
+
+        def fetch(code):
+            try:
+                return code, self._download(code)
+            except requests.RequestException as e:
+                print(f"天気アイコンの取得に失敗 (天気コード: {code}): {e}")
+                return code, None
+
+        saved = 0
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for code, content in executor.map(fetch, missing):
+                if content:
+                    filename = self._save(content)
+                    with self._lock:
+                        self.manifest[code] = filename
+                    saved += 1
+
+        with self._lock:
+            manifest_path = os.path.join(self.icon_dir, MANIFEST_NAME)
+            with open(f"{manifest_path}.tmp", "w", encoding="utf-8") as f:
+                json.dump(self.manifest, f, ensure_ascii=False, indent=1, sort_keys=True)
+            os.replace(f"{manifest_path}.tmp", manifest_path)
+        print(f"天気アイコンを保存: {saved}/{len(missing)} 件")
+        return saved
+
+    def image_props(self, weather_code):
+        """ft.Image に設定する src / src_base64 を返す（未保存なら気象庁のURL）"""
+        filename = self.manifest.get(weather_code)
+        if filename is None:
+            return {"src": ICON_URL.format(weather_code=weather_code), "src_base64": None}
+        if not self.inline:
+            return {"src": f"/{ICON_SUBDIR}/{filename}", "src_base64": None}
+
+        encoded = self._base64.get(filename)
+        if encoded is None:
+            with open(os.path.join(self.icon_dir, filename), "rb") as f:
+                encoded = base64.b64encode(f.read()).decode("ascii")
+            self._base64[filename] = encoded
+        return {"src": None, "src_base64": encoded}
+
+
+if __name__ == "__main__":
+    # アプリに同梱するアイコンを事前にダウンロードする: python icon_cache.py
+    from jma_client import JmaClient
+
+    with JmaClient() as client:
+        IconCache(client).prefetch()
@@ -0,0 +1,153 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import requests
+
+JST = timezone(timedelta(hours=9))
+
+# 天気予報の定時発表時刻（日本時間）
+FORECAST_REPORT_HOURS = (5, 11, 17)
+# 発表時刻を過ぎても更新が出ていないときに再検証する間隔
+FORECAST_MIN_TTL = 10 * 60
+
+
+def next_forecast_report(report_datetime):
+    """reportDatetime の次の定時発表時刻を返す"""
+    report = datetime.fromisoformat(report_datetime).astimezone(JST)
+    for days in (0, 1):
+        day = report + timedelta(days=days)
+        for hour in FORECAST_REPORT_HOURS:
+            candidate = day.replace(hour=hour, minute=0, second=0, microsecond=0)
+            if candidate > report:
+                return candidate
+
+
+def forecast_expires_at(data, now):
+    """天気予報JSONの有効期限（次の定時発表まで）をUNIX時刻で返す"""
+    try:
+        expires_at = next_forecast_report(data[0]["reportDatetime"]).timestamp()
+    except (LookupError, TypeError, ValueError):
+        return now + FORECAST_MIN_TTL
+    # 発表時刻を過ぎても新しいデータが出るまでは一定間隔で再検証する
+    return max(expires_at, now + FORECAST_MIN_TTL)
+
+
+class JsonCache:
+    """気象庁APIのJSONレスポンスをメモリとディスクに保持するキャッシュ
+
+    有効期限内はネットワークにアクセスせずに返し、期限切れ後は
+    ETag / Last-Modified を使った条件付きGETで再検証する。
+    通信には client（JmaClient）を使う。
+    """
+
+    def __init__(self, cache_dir, client, default_ttl=600):
+        self.cache_dir = cache_dir
+        self.client = client
+        self.default_ttl = default_ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+        # 応答の内訳（有効期限内 / 新規取得 / 304で再利用 / 取得失敗で古いデータ）
+        self.stats = {"hit": 0, "miss": 0, "not_modified": 0, "stale": 0}
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _load(self, key):
+        """メモリになければディスクからエントリを読み込む"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            return entry
+        try:
+            with open(self._path(key), encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        self._entries[key] = entry
+        return entry
+
+    def _store(self, key, entry):
+        """エントリをメモリとディスクに保存（書き込み途中で壊れないよう置き換えで保存）"""
+        self._entries[key] = entry
+        path = self._path(key)
+        tmp_path = f"{path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"キャッシュの保存に失敗 ({key}): {e}")
+
+    def get(self, key, url, ttl=None, expires=None):
+        """キャッシュ経由でJSONを取得する
+
+        有効期限内ならキャッシュをそのまま返す。期限切れなら条件付きGETを行い、
+        304 Not Modified の場合はキャッシュの期限だけを延長する。
+        再検証に失敗した場合は古いキャッシュがあればそれを返す。
+        expires を渡すと、TTLの代わりに expires(data, now) を有効期限として使う。
+        """
+        return self.fetch(key, url, ttl, expires)[0]
+
+    def fetch(self, key, url, ttl=None, expires=None):
+        """get と同じだが、(データ, 古いデータか) を返す
+
+        古いデータ（再検証に失敗して手元のキャッシュで応答した）かどうかで、
+        呼び出し側が取得の失敗として扱えるようにする。
+        """
+        ttl = self.default_ttl if ttl is None else ttl
+        with self._lock:
+            entry = self._load(key)
+        now = time.time()
+        if entry is not None and now < entry["expires_at"]:
+            self.stats["hit"] += 1
+            return entry["data"], False
+
+        headers = {}
+        if entry is not None:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        try:
+            response = self.client.get(url, headers=headers)
+            if response.status_code == 304 and entry is not None:
+                self.stats["not_modified"] += 1
+                entry = dict(entry, fetched_at=now)
+            else:
+                self.stats["miss"] += 1
+                response.raise_for_status()
+                entry = {
+                    "url": url,
+                    "data": response.json(),
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified"),
+                    "fetched_at": now,
+                }
+            entry["expires_at"] = expires(entry["data"], now) if expires else now + ttl
+        except requests.RequestException:
+            if entry is not None:
+                # 再検証できなくても手元のデータで応答する
+                self.stats["stale"] += 1
+                return entry["data"], True
+            raise
+
+        with self._lock:
+            self._store(key, entry)
+        return entry["data"], False
+
+    def invalidate(self, key=None):
+        """指定したキー（省略時はすべて）のキャッシュを削除する"""
+        with self._lock:
+            keys = [key] if key is not None else list(self._entries)
+            if key is None:
+                keys += [name[:-5] for name in os.listdir(self.cache_dir) if name.endswith(".json")]
+            for k in set(keys):
+                self._entries.pop(k, None)
+                try:
+                    os.remove(self._path(k))
+                except OSError:
+                    pass
@@ -0,0 +1,53 @@
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# タイムアウト（接続, 読み込み）秒
+CONNECT_TIMEOUT = 3.05
+READ_TIMEOUT = 10
+# 一時的なエラーのときのリトライ設定
+RETRIES = 3
+BACKOFF = 0.5
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# 同時に保持する接続数
+POOL_SIZE = 10
+
+
+class JmaClient:
+    """気象庁APIへの接続を使い回すHTTPクライアント
+
+    requests.Session のコネクションプールでTCP/TLS接続をキープアライブし、
+    接続エラーや5xxは指数バックオフでリトライする。
+    """
+
+    def __init__(self, retries=RETRIES, backoff=BACKOFF, pool_size=POOL_SIZE):
+        self.timeout = (CONNECT_TIMEOUT, READ_TIMEOUT)
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset(["GET"]),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def get(self, url, headers=None, stream=False):
+        return self.session.get(url, headers=headers, timeout=self.timeout, stream=stream)
+
+    def get_json(self, url):
+        response = self.get(url)
+        response.raise_for_status()
+        return response.json()
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
@@ -1,300 +1,478 @@
+import asyncio
 import flet as ft
+import os
 import requests
-import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import partial
+
+from area_index import AreaIndex
+from forecast_table import forecast_rows, parse_forecasts
+from forecast_view import CompareView, ForecastView, describe_age, set_if_changed
+from icon_cache import IconCache
+from jma_cache import JsonCache, forecast_expires_at
+from jma_client import POOL_SIZE, JmaClient
+from metrics import METRICS_PORT, metrics
+from scheduler import RefreshScheduler
+from weather_db import WeatherRepository
 
 # APIエンドポイントの定義
-AREA_URL = "http://www.jma.go.jp/bosai/common/const/area.json"
+AREA_URL = "https://www.jma.go.jp/bosai/common/const/area.json"
 WEATHER_URL = "https://www.jma.go.jp/bosai/forecast/data/forecast/{area_code}.json"
 
-# データベース設定
-DB_PATH = 'weather_forecast.db'
+# データベース設定（JMA_DB で別のファイルを指定できる）
+DB_PATH = os.environ.get("JMA_DB", 'weather_forecast.db')
+
+# APIキャッシュ設定（データベースと同じ場所に保存）
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(DB_PATH)), 'jma_cache')
+AREA_CACHE_TTL = 24 * 60 * 60  # area.jsonはほとんど更新されないので1日
+
+# 気象庁APIへの接続はこのクライアントで使い回す
+client = JmaClient()
+api_cache = JsonCache(CACHE_DIR, client)
+
+def cache_gauges():
+    """APIキャッシュの応答の内訳とヒット率（304で再利用したものもヒットに数える）"""
+    stats = dict(api_cache.stats)
+    total = sum(stats.values())
+    hits = stats["hit"] + stats["not_modified"]
+    return {**{f"cache_{name}_total": value for name, value in stats.items()},
+            "cache_hit_ratio": round(hits / total, 4) if total else 0}
+
+def record_http_response(response, *args, **kwargs):
+    """応答ヘッダーが届くまでの時間（DNS・接続・気象庁側の処理を含む）を記録する"""
+    metrics.observe("http", response.elapsed.total_seconds(), status=response.status_code, url=response.url)
+
+if metrics.enabled:
+    metrics.add_gauges(cache_gauges)
+    client.session.hooks["response"].append(record_http_response)
+
+# 天気アイコンはアセットディレクトリに保存して配信する
+# （JMA_OFFLINE_ICONS=1 で画像をページに埋め込み、アイコン用の通信を一切しない）
+icon_cache = IconCache(client, inline=os.environ.get("JMA_OFFLINE_ICONS") == "1")
+
+# 起動時に全予報区の天気予報を先読みする（キオスク用、JMA_PREFETCH=1 で有効）
+PREFETCH_ON_START = os.environ.get("JMA_PREFETCH") == "1"
+PREFETCH_WORKERS = 4
+# 比較表示で選んだ地域は一度にまとめて取得する（同時に使える接続数まで）
+COMPARE_MAX_WORKERS = POOL_SIZE
+
+# 保存済みの天気予報を発表時刻ごとに更新する（JMA_REFRESH=0 で無効）
+REFRESH_IN_BACKGROUND = os.environ.get("JMA_REFRESH", "1") == "1"
+
+# 市区町村名の検索で表示する候補の数
+SEARCH_LIMIT = 20
+
+# 保存済みの予報を表示しているときに、気象庁への再取得を試みる間隔（秒）
+STALE_RETRY_DELAYS = (10, 30, 120)
+
+# データベースへの接続はこのリポジトリで使い回す
+repo = WeatherRepository(DB_PATH)
 
 def init_database():
     """データベースの初期化と必要なテーブルの作成"""
-    con = sqlite3.connect(DB_PATH)
-    cur = con.cursor()
-    
-    # 天気予報データを保存するテーブル
-    cur.execute('''
-    CREATE TABLE IF NOT EXISTS weather_forecasts (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        region_name TEXT,
-        date TEXT,
-        weather TEXT,
-        max_temp TEXT,
-        min_temp TEXT,
-        weather_code TEXT,
-        fetched_at DATETIME DEFAULT CURRENT_TIMESTAMP
-    )
-    ''')
-    
-    con.commit()
-    con.close()
+    repo.init_schema()
 
 def fetch_area_list():
+    """地域リストを取得（キャッシュが有効な間は通信しない）"""
     try:
-        response = requests.get(AREA_URL)
-        response.raise_for_status()
-        return response.json()
+        with metrics.span("fetch_area"):
+            return api_cache.get("area", AREA_URL, ttl=AREA_CACHE_TTL)
     except requests.RequestException as e:
+        metrics.count("fetch_errors")
         print(f"地域リストの取得に失敗: {e}")
         return None
 
 def fetch_weather(area_code):
+    """天気予報を取得（次の定時発表まではキャッシュを返す）
+
+    気象庁に接続できず期限切れのキャッシュしかないときは、取得の失敗としてNoneを返す
+    （古い予報を保存し直して取得日時を進めないようにする）。
+    """
     try:
-        response = requests.get(WEATHER_URL.format(area_code=area_code))
-        response.raise_for_status()
-        return response.json()
+        with metrics.span("fetch_weather", area_code=area_code):
+            weather_data, stale = api_cache.fetch(
+                f"forecast_{area_code}",
+                WEATHER_URL.format(area_code=area_code),
+                expires=forecast_expires_at,
+            )
     except requests.RequestException as e:
+        metrics.count("fetch_errors")
         print(f"天気情報の取得に失敗 (地域コード: {area_code}): {e}")
         return None
+    if stale:
+        metrics.count("fetch_errors")
+        print(f"天気情報の取得に失敗 (地域コード: {area_code}): 期限切れのキャッシュしかありません")
+        return None
+    return weather_data
 
-def find_matching_area(area_data, weather_data, target_name):
-    if area_data is None or weather_data is None:
+# area.json から作った地域の索引（area.json を取り直したときだけ作り直す）
+_area_index = {"data": None, "index": None}
+_area_index_lock = threading.Lock()
+
+def get_area_index():
+    """地域の索引を返す（地域リストを取得できなければNone）"""
+    area_data = fetch_area_list()
+    if not area_data:
+        return None
+    with _area_index_lock:
+        if _area_index["data"] is not area_data:
+            _area_index["index"] = AreaIndex(area_data)
+            _area_index["data"] = area_data
+        return _area_index["index"]
+
+def find_matching_area(area_index, weather_data, region_code):
+    """予報の中から、指定した予報区（offices）に属する一次細分区域の予報を探す"""
+    if area_index is None or weather_data is None:
         return None, None
     
-    for series in weather_data[0]["timeSeries"]:
-        matching_areas = [
-            area for area in series["areas"] 
-            if any(target_name in subname for subname in [area["area"]["name"], target_name])
-        ]
-        
-        if matching_areas:
-            return matching_areas[0], series["timeDefines"]
+    series_list = weather_data[0]["timeSeries"]
+    for series in series_list:
+        for area in series["areas"]:
+            if area_index.ancestor("class10s", area["area"]["code"], "offices") == region_code:
+                return area, series["timeDefines"]
     
+    # 索引にない区域しかなければ、以前と同じく最初の区域を使う
+    if series_list and series_list[0]["areas"]:
+        return series_list[0]["areas"][0], series_list[0]["timeDefines"]
     return None, None
 
-def save_weather_data(region_name, weather_data):
-    """天気データをデータベースに保存"""
-    con = sqlite3.connect(DB_PATH)
-    cur = con.cursor()
-    
-    # 既存のデータを削除（同じ地域の古いデータを上書き）
-    cur.execute("DELETE FROM weather_forecasts WHERE region_name = ?", (region_name,))
-    
-    # 天気コードとアイコンの対応表
-    weather_code_map = {
-        "晴れ": "100", "晴時々曇": "101", "晴一時曇": "102",
-        "晴時々雨": "103", "晴一時雨": "104", "晴時々雪": "105",
-        "晴一時雪": "106", "曇り": "200", "曇時々晴": "201",
-        "曇一時晴": "202", "曇時々雨": "203", "曇一時雨": "204",
-        "曇時々雪": "205", "曇一時雪": "206", "雨": "300", "雪": "400"
-    }
-    
+def build_forecast_data(region_code, weather_data, table=None, doc=0):
+    """保存用の日付ごとの予報を作る（該当する区域がなければNone）
+
+    table には parse_forecasts でまとめて変換済みの表を渡せる（doc はその中の番号）。
+    """
     # マッチングエリアと時間情報の取得
-    matching_area, time_defines = find_matching_area(fetch_area_list(), weather_data, region_name)
-    
-    if matching_area and time_defines:
-        # データベースに保存するデータを準備
-        forecast_data = []
-        for time_idx, time in enumerate(time_defines):
-            if "weathers" in matching_area:
-                weather = matching_area["weathers"][time_idx] if time_idx < len(matching_area["weathers"]) else "情報なし"
-                
-                # 気温情報の取得
-                max_temp = matching_area["tempsMax"][time_idx] if "tempsMax" in matching_area and time_idx < len(matching_area["tempsMax"]) else ""
-                min_temp = matching_area["tempsMin"][time_idx] if "tempsMin" in matching_area and time_idx < len(matching_area["tempsMin"]) else ""
-                
-                # 天気コードの取得
-                weather_code = "100"  # デフォルト
-                for key, code in weather_code_map.items():
-                    if key in weather:
-                        weather_code = code
-                        break
-                
-                # 日付のフォーマット
-                date = time.split("T")[0]
-                
-                forecast_data.append((
-                    region_name, date, weather, max_temp, min_temp, weather_code
-                ))
-        
-        # データベースに一括挿入
-        cur.executemany('''
-            INSERT INTO weather_forecasts 
-            (region_name, date, weather, max_temp, min_temp, weather_code) 
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', forecast_data)
-        
-        con.commit()
-        con.close()
-        return True
-    
-    con.close()
-    return False
+    matching_area, time_defines = find_matching_area(get_area_index(), weather_data, region_code)
+    if not (matching_area and time_defines):
+        return None
 
-def fetch_weather_from_database(region_name):
-    """データベースから特定の地域の天気データを取得"""
-    con = sqlite3.connect(DB_PATH)
-    cur = con.cursor()
-    
-    cur.execute('''
-        SELECT date, weather, max_temp, min_temp, weather_code 
-        FROM weather_forecasts 
-        WHERE region_name = ? 
-        ORDER BY date
-    ''', (region_name,))
-    
-    results = cur.fetchall()
-    con.close()
-    
-    return results
+    # 日付ごとの天気・気温・風・降水確率を表から取り出す
+    if table is None:
+        table = parse_forecasts([weather_data])
+    return forecast_rows(table, matching_area["area"]["code"], doc)
+
+def save_weather_data(region_code, region_name, weather_data, table=None, doc=0):
+    """天気データをデータベースに保存"""
+    forecast_data = build_forecast_data(region_code, weather_data, table, doc)
+    if forecast_data is None:
+        return False
+
+    # 同じ地域・日付のデータだけを上書き（過去の予報は履歴として残る）
+    with metrics.span("save", area_code=region_code):
+        repo.save_forecasts(region_code, region_name, forecast_data)
+    return True
+
+def fetch_weather_from_database(region_code):
+    """データベースから特定の地域の今日以降の天気データを取得"""
+    with metrics.span("query", area_code=region_code):
+        return repo.get_forecasts(region_code, datetime.now().strftime("%Y-%m-%d"))
+
+def load_stored_weather(region_code):
+    """保存済みの天気予報と、その取得日時を返す（保存されていなければNone）"""
+    weather_info = fetch_weather_from_database(region_code)
+    if not weather_info:
+        return None
+    return weather_info, repo.get_fetched_at(region_code)
+
+def refresh_forecast(region_code, region_name):
+    """天気予報を取得してデータベースを更新する"""
+    weather_data = fetch_weather(region_code)
+    return bool(weather_data) and save_weather_data(region_code, region_name, weather_data)
+
+refresh_scheduler = RefreshScheduler(refresh_forecast, repo.list_areas)
+
+def load_weather(region_code, region_name):
+    """天気予報を取得・保存し、表示用にデータベースから読み出す（取得できなければNone）"""
+    weather_data = fetch_weather(region_code)
+    if not weather_data:
+        return None
+
+    # データベースに保存
+    if save_weather_data(region_code, region_name, weather_data):
+        # データベース内容の確認（開発時のデバッグ用）
+        print_database_contents(region_code)
+
+    return fetch_weather_from_database(region_code)
+
+def save_many_forecasts(regions, max_workers=PREFETCH_WORKERS):
+    """複数の地域 [(コード, 名前)] の天気予報を並行して取得し、データベースに保存する"""
+    # 通信だけを並列化し、データベースへの書き込みはこのスレッドで順番に行う
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(fetch_weather, [code for code, _ in regions]))
+
+    # 取得できた予報はまとめて1つの表に変換し、1つのトランザクションで保存する
+    fetched = [(region, data) for region, data in zip(regions, results) if data]
+    table = parse_forecasts([data for _, data in fetched])
+    items = []
+    for doc, ((code, name), weather_data) in enumerate(fetched):
+        forecast_data = build_forecast_data(code, weather_data, table, doc)
+        if forecast_data is not None:
+            items.append((code, name, forecast_data))
+    with metrics.span("save", areas=len(items)):
+        repo.save_many(items)
+    return len(items)
+
+def load_weather_many(regions):
+    """複数の地域の天気予報を取得・保存し、1回のクエリでまとめて読み出す
 
-def print_database_contents(region_name=None):
+    取得できなかった地域も、保存済みの予報があればそれを返す。
+    """
+    save_many_forecasts(regions, max_workers=max(1, min(len(regions), COMPARE_MAX_WORKERS)))
+    return repo.get_forecasts_many([code for code, _ in regions], datetime.now().strftime("%Y-%m-%d"))
+
+def prefetch_all_forecasts(max_workers=PREFETCH_WORKERS):
+    """全予報区の天気予報を並行して取得し、データベースに保存する"""
+    area_index = get_area_index()
+    if not area_index:
+        return 0
+
+    offices = [
+        office
+        for center in area_index.ids["centers"]
+        for office in area_index.children("centers", center)
+    ]
+    saved = save_many_forecasts(offices, max_workers)
+
+    print(f"天気予報の先読み完了: {saved}/{len(offices)} 地域")
+    return saved
+
+def print_database_contents(region_code=None):
     """データベースの内容を表示"""
-    con = sqlite3.connect(DB_PATH)
-    cur = con.cursor()
-    
-    if region_name:
-        cur.execute('''
-            SELECT * FROM weather_forecasts 
-            WHERE region_name = ?
-            ORDER BY date
-        ''', (region_name,))
-    else:
-        cur.execute('SELECT * FROM weather_forecasts ORDER BY fetched_at DESC')
-    
     print("\n--- データベース内容 ---")
-    for row in cur.fetchall():
-        print(f"ID: {row[0]}, 地域: {row[1]}, 日付: {row[2]}, "
-              f"天気: {row[3]}, 最高気温: {row[4]}, 最低気温: {row[5]}, "
-              f"天気コード: {row[6]}, 取得日時: {row[7]}")
+    for row in repo.get_rows(region_code):
+        print(f"ID: {row[0]}, 地域: {row[2]} ({row[1]}), 日付: {row[3]}, "
+              f"天気: {row[4]}, 最高気温: {row[5]}, 最低気温: {row[6]}, "
+              f"天気コード: {row[7]}, 取得日時: {row[8]}")
     
     # 基本統計情報
-    cur.execute('SELECT COUNT(*) FROM weather_forecasts')
-    total_records = cur.fetchone()[0]
+    total_records = repo.count()
     print(f"\n総レコード数: {total_records}")
-    
-    con.close()
 
 def main(page: ft.Page):
     # データベースの初期化
     init_database()
+
+    # まだ保存していない天気アイコンだけをダウンロードする
+    page.run_thread(icon_cache.prefetch)
+    if PREFETCH_ON_START:
+        page.run_thread(prefetch_all_forecasts)
+    if REFRESH_IN_BACKGROUND:
+        page.run_task(refresh_scheduler.run)
     
     page.title = "気象庁天気予報アプリ"
     page.vertical_alignment = ft.MainAxisAlignment.CENTER
+    page.scroll = "auto"  # スクロール可能にする
 
-    def show_weather(e, region_code, region_name):
-        weather_data = fetch_weather(region_code)
-        
-        if not weather_data:
-            page.add(ft.Text("天気情報を取得できません", color="red"))
-            return
+    # 画面遷移の番号（読み込み中に別の画面へ移ったら古い結果は表示しない）
+    navigation = {"seq": 0}
 
-        # データベースに保存
-        if save_weather_data(region_name, weather_data):
-            # データベース内容の確認（開発時のデバッグ用）
-            print_database_contents(region_name)
-        
-        # 天気データの表示
-        weather_info = fetch_weather_from_database(region_name)
-        
-        weather_cards = []
-        for date, weather, max_temp, min_temp, weather_code in weather_info:
-            card = ft.Card(
-                content=ft.Container(
-                    content=ft.Column(
-                        [
-                            ft.Text(date, size=16, weight=ft.FontWeight.BOLD),
-                            ft.Image(
-                                src=f"https://www.jma.go.jp/bosai/forecast/img/{weather_code}.svg",
-                                width=50,
-                                height=50,
-                            ),
-                            ft.Text(weather),
-                            ft.Text(
-                                f"{min_temp}°C / {max_temp}°C" if min_temp and max_temp else "",
-                                color=ft.colors.BLUE if min_temp else None
-                            ),
-                        ],
-                        horizontal_alignment=ft.CrossAxisAlignment.CENTER,
-                        spacing=10,
-                    ),
-                    padding=10,
-                ),
-                width=200,
-            )
-            weather_cards.append(card)
-
-        page.controls.clear()
-        page.add(
-            ft.Column(
-                [
-                    ft.Text(f"{region_name}の天気予報", size=24, weight=ft.FontWeight.BOLD),
-                    ft.Row(
-                        weather_cards,
-                        scroll=ft.ScrollMode.AUTO,
-                        spacing=10,
-                    ),
-                    ft.ElevatedButton("戻る", on_click=show_main_menu, width=300)
-                ],
-                horizontal_alignment=ft.CrossAxisAlignment.CENTER,
-                spacing=20
-            )
-        )
+    # 各画面は最初に一度だけ作ってページに置いておき、表示・非表示を切り替える。
+    # 画面を作り直さないので、更新時には変わった値だけが送信される。
+    loading_text = ft.Text()
+    loading_view = ft.Column(
+        [ft.ProgressRing(), loading_text],
+        horizontal_alignment=ft.CrossAxisAlignment.CENTER,
+        spacing=20
+    )
+
+    error_text = ft.Text(color="red")
+    error_view = ft.Column(
+        [
+            error_text,
+            ft.ElevatedButton("戻る", on_click=lambda e: show_main_menu(), width=300)
+        ],
+        horizontal_alignment=ft.CrossAxisAlignment.CENTER,
+        spacing=20
+    )
+
+    region_buttons = ft.Column(horizontal_alignment=ft.CrossAxisAlignment.CENTER)
+    compare_button = ft.ElevatedButton("選択した地域を比較", width=300)
+    regions_view = ft.Column(
+        [
+            ft.Text("地域を選択してください", size=20, weight=ft.FontWeight.BOLD),
+            ft.Text("チェックした地域は並べて比較できます"),
+            region_buttons,
+            compare_button,
+            ft.ElevatedButton("戻る", on_click=lambda e: show_main_menu(), width=300)
+        ],
+        horizontal_alignment=ft.CrossAxisAlignment.CENTER,
+        spacing=10
+    )
+
+    forecast_view = ForecastView(on_back=lambda e: show_main_menu(), icons=icon_cache)
+    compare_view = CompareView(on_back=lambda e: show_main_menu(), icons=icon_cache)
+
+    def show_view(view):
+        """指定した画面だけを表示する"""
+        for control in page.controls:
+            control.visible = control is view
         page.update()
 
-    def show_regions(region_code):
-        area_data = fetch_area_list()
-        if not area_data:
-            page.add(ft.Text("地域情報の取得に失敗しました", color="red"))
+    def next_navigation():
+        """新しい画面遷移の番号を返す"""
+        navigation["seq"] += 1
+        return navigation["seq"]
+
+    def show_loading(message):
+        loading_text.value = message
+        show_view(loading_view)
+
+    def start_navigation(message):
+        """読み込み中の表示に切り替え、この遷移の番号を返す"""
+        seq = next_navigation()
+        show_loading(message)
+        return seq
+
+    def show_error(message):
+        error_text.value = message
+        show_view(error_view)
+
+    async def show_weather(e, region_code, region_name):
+        refresh_scheduler.touch(region_code, region_name)
+        seq = next_navigation()
+
+        # 保存済みの予報があればすぐに表示し、最新の予報はその後で取りに行く
+        stored = await asyncio.to_thread(load_stored_weather, region_code)
+        if seq != navigation["seq"]:
             return
+        if stored:
+            weather_info, fetched_at = stored
+            with metrics.span("render", view="forecast", stale=True):
+                forecast_view.show_forecasts(
+                    region_name, weather_info, f"{describe_age(fetched_at)}に取得した予報を表示しています（更新中）"
+                )
+                show_view(forecast_view)
+        else:
+            show_loading(f"{region_name}の天気予報を取得しています")
 
-        children = area_data["centers"][region_code]["children"]
+        # 通信とデータベースの処理はイベントループを止めないよう別スレッドで行う。
+        # 取得できなければ、保存済みの予報を表示したまま間隔をあけて再試行する
+        for delay in (0,) + STALE_RETRY_DELAYS:
+            await asyncio.sleep(delay)
+            if seq != navigation["seq"]:
+                return
+            weather_info = await asyncio.to_thread(load_weather, region_code, region_name)
+            if seq != navigation["seq"]:
+                return
 
-        region_buttons = []
-        for code in children:
-            region_info = area_data["offices"][code]
-            region_name = region_info["name"]
-            button = ft.OutlinedButton(
-                text=region_name, 
-                on_click=lambda e, rc=code, rn=region_name: show_weather(e, rc, rn),
-                width=300
-            )
-            region_buttons.append(button)
-
-        page.controls.clear()
-        page.add(
-            ft.Column(
-                [
-                    ft.Text("地域を選択してください", size=20, weight=ft.FontWeight.BOLD),
-                    ft.Column(region_buttons, horizontal_alignment=ft.CrossAxisAlignment.CENTER),
-                    ft.ElevatedButton("戻る", on_click=show_main_menu, width=300)
-                ],
-                horizontal_alignment=ft.CrossAxisAlignment.CENTER,
-                spacing=10
+            if weather_info is not None:
+                # 天気データの表示（前回のカードを使い回して差分だけ更新）
+                with metrics.span("render", view="forecast"):
+                    forecast_view.show_forecasts(region_name, weather_info)
+                    show_view(forecast_view)
+                return
+            if not stored:
+                show_error("天気情報を取得できません")
+                return
+            forecast_view.set_status(
+                f"最新の天気予報を取得できません。{describe_age(fetched_at)}に取得した予報を表示しています"
             )
-        )
-        page.update()
+            page.update()
 
-    def show_main_menu(e=None):
-        page.controls.clear()
-        page.scroll = "auto"  # スクロール可能にする
-        page.add(
-            ft.Column(
-                [
-                    ft.Text("気象庁天気予報アプリ", size=24, weight=ft.FontWeight.BOLD),
-                    ft.ElevatedButton("北海道地方", on_click=lambda e: show_regions("010100"), width=300),
-                    ft.ElevatedButton("東北地方", on_click=lambda e: show_regions("010200"), width=300),
-                    ft.ElevatedButton("関東甲信地方", on_click=lambda e: show_regions("010300"), width=300),
-                    ft.ElevatedButton("東海地方", on_click=lambda e: show_regions("010400"), width=300),
-                    ft.ElevatedButton("北陸地方", on_click=lambda e: show_regions("010500"), width=300),
-                    ft.ElevatedButton("近畿地方", on_click=lambda e: show_regions("010600"), width=300),
-                    ft.ElevatedButton("中国地方", on_click=lambda e: show_regions("010700"), width=300),
-                    ft.ElevatedButton("四国地方", on_click=lambda e: show_regions("010800"), width=300),
-                    ft.ElevatedButton("九州北部地方", on_click=lambda e: show_regions("010900"), width=300),
-                    ft.ElevatedButton("九州南部・奄美地方", on_click=lambda e: show_regions("011000"), width=300),
-                    ft.ElevatedButton("沖縄地方", on_click=lambda e: show_regions("011100"), width=300),
-                ],
-                horizontal_alignment=ft.CrossAxisAlignment.CENTER,
-                alignment=ft.MainAxisAlignment.CENTER,
-                spacing=20
-            )
-        )
+    async def show_regions(e, region_code):
+        seq = start_navigation("地域情報を取得しています")
+        area_index = await asyncio.to_thread(get_area_index)
+        if seq != navigation["seq"]:
+            return
+
+        if not area_index:
+            show_error("地域情報の取得に失敗しました")
+            return
+
+        with metrics.span("render", view="regions"):
+            region_buttons.controls = []
+            for code, region_name in area_index.children("centers", region_code):
+                button = ft.OutlinedButton(
+                    text=region_name, 
+                    on_click=partial(show_weather, region_code=code, region_name=region_name),
+                    width=300
+                )
+                region_buttons.controls.append(ft.Row(
+                    [ft.Checkbox(data=(code, region_name)), button],
+                    alignment=ft.MainAxisAlignment.CENTER,
+                ))
+
+            show_view(regions_view)
+
+    async def show_comparison(e):
+        regions = [row.controls[0].data for row in region_buttons.controls if row.controls[0].value]
+        if not regions:
+            return
+        seq = start_navigation(f"{len(regions)} 地域の天気予報を取得しています")
+
+        # 選んだ地域をまとめて並行に取得し、1回のクエリで読み出す
+        forecasts = await asyncio.to_thread(load_weather_many, regions)
+        if seq != navigation["seq"]:
+            return
+
+        compare_view.show_comparison(regions, forecasts)
+        show_view(compare_view)
+
+    compare_button.on_click = show_comparison
+
+    def show_main_menu():
+        navigation["seq"] += 1
+        show_view(menu_view)
+
+    async def show_search_result(e):
+        region_code, region_name = e.control.data
+        await show_weather(e, region_code, region_name)
+
+    def search_areas(e):
+        """入力のたびに市区町村を絞り込む（候補のボタンは使い回す）"""
+        query = search_field.value or ""
+        area_index = get_area_index() if query.strip() else None
+        results = area_index.search(query, limit=SEARCH_LIMIT) if area_index else []
+        # 検索中にさらに入力されていたら、この結果は表示しない
+        if query != search_field.value:
+            return
+
+        for button, (code, name) in zip(search_results.controls, results):
+            office_code = area_index.ancestor("class20s", code, "offices")
+            office_name = area_index.name("offices", office_code)
+            set_if_changed(button, "text", f"{name}（{office_name}）")
+            button.data = (office_code, office_name)
+            set_if_changed(button, "visible", True)
+        for button in search_results.controls[len(results):]:
+            set_if_changed(button, "visible", False)
         page.update()
 
+    search_field = ft.TextField(label="市区町村名で検索", on_change=search_areas, width=300)
+    search_results = ft.Column(
+        [ft.OutlinedButton(on_click=show_search_result, width=300, visible=False) for _ in range(SEARCH_LIMIT)],
+        horizontal_alignment=ft.CrossAxisAlignment.CENTER,
+    )
+
+    menu_view = ft.Column(
+        [
+            ft.Text("気象庁天気予報アプリ", size=24, weight=ft.FontWeight.BOLD),
+            search_field,
+            search_results,
+            ft.ElevatedButton("北海道地方", on_click=partial(show_regions, region_code="010100"), width=300),
+            ft.ElevatedButton("東北地方", on_click=partial(show_regions, region_code="010200"), width=300),
+            ft.ElevatedButton("関東甲信地方", on_click=partial(show_regions, region_code="010300"), width=300),
+            ft.ElevatedButton("東海地方", on_click=partial(show_regions, region_code="010400"), width=300),
+            ft.ElevatedButton("北陸地方", on_click=partial(show_regions, region_code="010500"), width=300),
+            ft.ElevatedButton("近畿地方", on_click=partial(show_regions, region_code="010600"), width=300),
+            ft.ElevatedButton("中国地方", on_click=partial(show_regions, region_code="010700"), width=300),
+            ft.ElevatedButton("四国地方", on_click=partial(show_regions, region_code="010800"), width=300),
+            ft.ElevatedButton("九州北部地方", on_click=partial(show_regions, region_code="010900"), width=300),
+            ft.ElevatedButton("九州南部・奄美地方", on_click=partial(show_regions, region_code="011000"), width=300),
+            ft.ElevatedButton("沖縄地方", on_click=partial(show_regions, region_code="011100"), width=300),
+        ],
+        horizontal_alignment=ft.CrossAxisAlignment.CENTER,
+        alignment=ft.MainAxisAlignment.CENTER,
+        spacing=20
+    )
+
+    for view in (menu_view, loading_view, error_view, regions_view, forecast_view, compare_view):
+        view.visible = False
+        page.add(view)
     show_main_menu()
 
 if __name__ == "__main__":
-    ft.app(target=main)
\ No newline at end of file
+    if METRICS_PORT:
+        metrics.serve(METRICS_PORT)
+    ft.app(target=main, assets_dir="assets")
\ No newline at end of file
@@ -0,0 +1,120 @@
+import http.server
+import json
+import os
+import threading
+import time
+from contextlib import nullcontext
+
+# JMA_METRICS_PORT を指定すると http://127.0.0.1:PORT/metrics で集計を返す
+METRICS_PORT = int(os.environ.get("JMA_METRICS_PORT", "0"))
+# JMA_METRICS=1（またはポートの指定）で計測を有効にする（無効のときは何も記録しない）
+METRICS_ENABLED = os.environ.get("JMA_METRICS") == "1" or bool(METRICS_PORT)
+
+# 無効のときに span() が返す、何もしないコンテキストマネージャー
+_NOOP = nullcontext()
+
+
+class _Span:
+    __slots__ = ("metrics", "name", "fields", "start")
+
+    def __init__(self, metrics, name, fields):
+        self.metrics = metrics
+        self.name = name
+        self.fields = fields
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.observe(self.name, time.perf_counter() - self.start, error=exc_type is not None, **self.fields)
+
+
+class Metrics:
+    """処理ごとの所要時間とカウンターを集計する
+
+    with metrics.span("fetch_weather", area_code=code): のように囲むと、
+    所要時間を集計し、1行のJSONとしてログに出力する。
+    無効のときは span() が共有の何もしないオブジェクトを返すだけなので、ほぼコストがかからない。
+    """
+
+    def __init__(self, enabled=METRICS_ENABLED, log=True):
+        self.enabled = enabled
+        self.log = log
+        self._lock = threading.Lock()
+        self.timings = {}   # 名前 -> [回数, 合計秒, 最大秒, エラー回数]
+        self.counters = {}
+        self._gauges = []
+
+    def span(self, name, **fields):
+        if not self.enabled:
+            return _NOOP
+        return _Span(self, name, fields)
+
+    def observe(self, name, seconds, error=False, **fields):
+        """所要時間を1件記録する"""
+        if not self.enabled:
+            return
+        with self._lock:
+            timing = self.timings.setdefault(name, [0, 0.0, 0.0, 0])
+            timing[0] += 1
+            timing[1] += seconds
+            timing[2] = max(timing[2], seconds)
+            timing[3] += error
+        if self.log:
+            record = {"ts": round(time.time(), 3), "span": name, "ms": round(seconds * 1000, 3), **fields}
+            if error:
+                record["error"] = True
+            print(json.dumps(record, ensure_ascii=False))
+
+    def count(self, name, n=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def add_gauges(self, func):
+        """集計を出力するときに呼ばれ、{名前: 値} を返す関数を登録する（キャッシュの統計など）"""
+        self._gauges.append(func)
+
+    def render(self):
+        """Prometheus のテキスト形式で集計を返す"""
+        lines = []
+        with self._lock:
+            timings = sorted(self.timings.items())
+            counters = sorted(self.counters.items())
+        for name, (count, total, longest, errors) in timings:
+            lines.append(f'jma_span_seconds_count{{span="{name}"}} {count}')
+            lines.append(f'jma_span_seconds_sum{{span="{name}"}} {total:.6f}')
+            lines.append(f'jma_span_seconds_max{{span="{name}"}} {longest:.6f}')
+            lines.append(f'jma_span_errors_total{{span="{name}"}} {errors}')
+        for name, value in counters:
+            lines.append(f"jma_{name}_total {value}")
+        for func in self._gauges:
+            for name, value in sorted(func().items()):
+                lines.append(f"jma_{name} {value}")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port=METRICS_PORT):
+        """/metrics で集計を返すHTTPサーバーを別スレッドで起動する"""
+        metrics = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = metrics.render().encode()
+                self.send_response(200 if self.path == "/metrics" else 404)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = http.server.ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        print(f"計測結果: http://127.0.0.1:{server.server_address[1]}/metrics")
+        return server
+
+
+metrics = Metrics()
@@ -0,0 +1,96 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from jma_cache import FORECAST_REPORT_HOURS, JST
+
+# 定時発表からこの時間だけ待ってから更新する（気象庁側の反映待ち）
+REFRESH_DELAY = timedelta(minutes=5)
+# 地域ごとの更新の間隔（秒）。気象庁に連続でアクセスしないようにする
+REFRESH_INTERVAL = 1.0
+# 優先して更新する「最近表示された地域」の数
+RECENT_LIMIT = 50
+
+
+def next_refresh_time(now=None):
+    """次に更新を行う時刻（定時発表 + REFRESH_DELAY）を返す"""
+    now = now or datetime.now(JST)
+    for days in (0, 1):
+        day = now + timedelta(days=days)
+        for hour in FORECAST_REPORT_HOURS:
+            candidate = day.replace(hour=hour, minute=0, second=0, microsecond=0) + REFRESH_DELAY
+            if candidate > now:
+                return candidate
+
+
+class RefreshScheduler:
+    """保存済みの天気予報を気象庁の発表時刻（5時・11時・17時）に合わせて更新する
+
+    refresh(area_code, area_name) で1地域を更新し、list_areas() で保存済みの地域を得る。
+    最近表示された地域から順に、REFRESH_INTERVAL 秒ずつ間隔をあけて更新する。
+    """
+
+    def __init__(self, refresh, list_areas, interval=REFRESH_INTERVAL):
+        self.refresh = refresh
+        self.list_areas = list_areas
+        self.interval = interval
+        self._recent = OrderedDict()
+        self._lock = threading.Lock()
+        self._started = False
+
+    def touch(self, area_code, area_name):
+        """地域が表示されたことを記録する"""
+        with self._lock:
+            self._recent.pop(area_code, None)
+            self._recent[area_code] = area_name
+            while len(self._recent) > RECENT_LIMIT:
+                self._recent.popitem(last=False)
+
+    def areas_by_priority(self):
+        """最近表示された順、続いてその他の保存済み地域の順に返す"""
+        with self._lock:
+            recent = list(reversed(self._recent.items()))
+        seen = {code for code, _ in recent}
+        return recent + [(code, name) for code, name in self.list_areas() if code not in seen]
+
+    def refresh_all(self):
+        refreshed = 0
+        for i, (code, name) in enumerate(self.areas_by_priority()):
+            if i:
+                time.sleep(self.interval)
+            try:
+                if self.refresh(code, name):
+                    refreshed += 1
+            except Exception as e:
+                print(f"天気予報の定期更新に失敗 (地域コード: {code}): {e}")
+        print(f"天気予報の定期更新完了: {refreshed} 地域")
+        return refreshed
+
+    async def run(self):
+        """Fletの page.run_task から起動する（複数のセッションから呼ばれても1つだけ動く）"""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        while True:
+            delay = (next_refresh_time() - datetime.now(JST)).total_seconds()
+            await asyncio.sleep(max(0, delay))
+            await asyncio.to_thread(self.refresh_all)
+
+    def run_forever(self):
+        """常駐プロセスとして定期更新を続ける"""
+        while True:
+            delay = (next_refresh_time() - datetime.now(JST)).total_seconds()
+            time.sleep(max(0, delay))
+            self.refresh_all()
+
+
+if __name__ == "__main__":
+    # Fletを起動せずに定期更新だけを行う: python scheduler.py
+    import main
+
+    main.init_database()
+    main.refresh_scheduler.refresh_all()
+    main.refresh_scheduler.run_forever()
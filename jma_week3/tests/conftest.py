@@ -0,0 +1,6 @@
+import os
+import sys
+
+# アプリのモジュールは jma_week3 ディレクトリからの import で書かれているので、そこをパスに入れる
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
@@ -0,0 +1,72 @@
+import json
+import os
+
+import pytest
+
+from amedas import COLUMNS, AmedasIngest, AmedasStore, iter_object_items, partition_name
+
+# map のJSON（2024-01-31 23:50 の観測、地点を絞ったもの）
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "20240131235000.json")
+
+
+def chunked(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def load_fixture():
+    with open(FIXTURE, "rb") as f:
+        return f.read()
+
+
+@pytest.mark.parametrize("size", [1, 7, 64, 1024, 1 << 20])
+def test_decoder_matches_json_loads_for_any_chunk_size(size):
+    data = load_fixture()
+    assert list(iter_object_items(chunked(data, size))) == list(json.loads(data).items())
+
+
+def test_decoder_handles_multibyte_characters_split_between_chunks():
+    data = json.dumps(
+        {"44132": {"name": "東京", "temp": [5.2, 0]}, "11001": {"name": "稚内", "temp": [-4.3, 0]}},
+        ensure_ascii=False,
+    ).encode("utf-8")
+    expected = list(json.loads(data).items())
+    # 1文字3バイトの漢字の途中も含めて、すべての位置で2つに分ける
+    for split in range(1, len(data)):
+        assert list(iter_object_items([data[:split], data[split:]])) == expected, split
+
+
+def test_decoder_rejects_truncated_json():
+    data = load_fixture()
+    with pytest.raises(ValueError):
+        list(iter_object_items(chunked(data[:-10], 100)))
+
+
+def test_ingest_file_writes_monthly_partitions(tmp_path):
+    stations = json.loads(load_fixture())
+    store = AmedasStore(str(tmp_path / "amedas.db"))
+    ingest = AmedasIngest(None, store)
+
+    # ファイル名の時刻（1月）と、月をまたいだ時刻（2月）で同じ観測値を取り込む
+    assert ingest.ingest_file(FIXTURE) == len(stations)
+    assert ingest.ingest_file(FIXTURE, observed_at=202402010000) == len(stations)
+
+    for observed_at in (202401312350, 202402010000):
+        table = partition_name(observed_at)
+        rows = store.con.execute(f"SELECT observed_at FROM {table}").fetchall()
+        assert rows == [(observed_at,)] * len(stations)
+
+    # その時刻の全地点は (地点, 気温, 1時間降水量, 風速, 風向)
+    at = {row[0]: row[1:] for row in store.at(202401312350)}
+    assert sorted(at) == sorted(int(station) for station in stations)
+    tokyo = stations["44132"]
+    assert at[44132] == (tokyo["temp"][0], tokyo["precipitation1h"][0], tokyo["wind"][0], tokyo["windDirection"][0])
+
+    # 地点の時系列は月のテーブルをまたいで読み出せる
+    series = store.station_series(44132, 202401312300, 202402010100)
+    assert [row[1] for row in series] == [202401312350, 202402010000]
+    assert dict(zip(COLUMNS, series[0]))["humidity"] == stations["44132"]["humidity"][0]
+
+    # 値のない項目や欠測は NULL になる
+    rainfall_only = dict(zip(COLUMNS, store.station_series(44116, 202401312350, 202401312351)[0]))
+    assert rainfall_only["temp"] is None and rainfall_only["precipitation_1h"] == 0.0
+    store.close()
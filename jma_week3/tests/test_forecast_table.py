@@ -0,0 +1,62 @@
+import copy
+import json
+import os
+
+from forecast_table import forecast_rows, parse_forecasts
+
+# 気象庁から記録した東京都（130000）の予報。気温は timeSeries[2] にアメダス地点のコードで入っている
+FIXTURE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmark_data", "forecast_130000.json")
+
+
+def load_fixture():
+    with open(FIXTURE, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_temps_come_from_station_series():
+    weather_data = load_fixture()
+    rows = forecast_rows(parse_forecasts([weather_data]), "130010")
+
+    temps = weather_data[0]["timeSeries"][2]
+    date = temps["timeDefines"][0][:10]
+    row = next(row for row in rows if row["date"] == date)
+    assert row["min_temp"] == temps["areas"][0]["temps"][0]
+    assert row["max_temp"] == temps["areas"][0]["temps"][1]
+
+
+def test_stations_map_to_areas_in_order():
+    weather_data = copy.deepcopy(load_fixture())
+    # 地点ごとに違う気温にして、区域と地点の対応が順番どおりかを確かめる
+    for i, station in enumerate(weather_data[0]["timeSeries"][2]["areas"]):
+        station["temps"] = [str(10 + i), str(20 + i)]
+    table = parse_forecasts([weather_data])
+
+    for i, area in enumerate(weather_data[0]["timeSeries"][0]["areas"]):
+        rows = [row for row in forecast_rows(table, area["area"]["code"]) if row["min_temp"] is not None]
+        assert rows and (rows[0]["min_temp"], rows[0]["max_temp"]) == (str(10 + i), str(20 + i))
+
+
+def test_weekly_temps_fill_missing_days():
+    weather_data = load_fixture()
+    rows = forecast_rows(parse_forecasts([weather_data]), "130010")
+
+    weekly = weather_data[1]["timeSeries"][1]
+    station = weekly["areas"][0]
+    short_dates = {time[:10] for time in weather_data[0]["timeSeries"][2]["timeDefines"]}
+    expected = {
+        time[:10]: (low, high)
+        for time, low, high in zip(weekly["timeDefines"], station["tempsMin"], station["tempsMax"])
+        if low and high and time[:10] not in short_dates
+    }
+    checked = [row for row in rows if row["date"] in expected]
+    assert checked
+    for row in checked:
+        assert (row["min_temp"], row["max_temp"]) == expected[row["date"]]
+
+
+def test_weather_code_prefers_forecast_codes():
+    weather_data = load_fixture()
+    rows = forecast_rows(parse_forecasts([weather_data]), "130010")
+
+    area = weather_data[0]["timeSeries"][0]["areas"][0]
+    assert [row["weather_code"] for row in rows] == area["weatherCodes"][:len(rows)]
@@ -0,0 +1,39 @@
+import json
+import os
+
+from forecast_table import forecast_rows, parse_forecasts
+from weather_db import WeatherRepository
+
+FIXTURE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmark_data", "forecast_130000.json")
+
+
+def saved_repository(tmp_path):
+    with open(FIXTURE, encoding="utf-8") as f:
+        weather_data = json.load(f)
+    forecasts = forecast_rows(parse_forecasts([weather_data]), "130010")
+    repo = WeatherRepository(str(tmp_path / "weather.db"))
+    repo.save_forecasts("130000", "東京都", forecasts)
+    return repo, forecasts
+
+
+def test_saved_forecast_creates_temperature_rows(tmp_path):
+    repo, forecasts = saved_repository(tmp_path)
+    with_temps = [forecast for forecast in forecasts if forecast["max_temp"] or forecast["min_temp"]]
+    assert with_temps
+
+    count = repo.con.execute("SELECT COUNT(*) FROM temperatures").fetchone()[0]
+    assert count == len(with_temps)
+
+    # 読み出すときは weather_forecasts と temperatures を結合して気温が戻る
+    rows = {date: (max_temp, min_temp) for date, _, max_temp, min_temp, _ in repo.get_forecasts("130000")}
+    for forecast in with_temps:
+        assert rows[forecast["date"]] == (forecast["max_temp"], forecast["min_temp"])
+    repo.close()
+
+
+def test_saving_again_does_not_duplicate_temperatures(tmp_path):
+    repo, forecasts = saved_repository(tmp_path)
+    repo.save_forecasts("130000", "東京都", forecasts)
+    count = repo.con.execute("SELECT COUNT(*) FROM temperatures").fetchone()[0]
+    assert count == len([forecast for forecast in forecasts if forecast["max_temp"] or forecast["min_temp"]])
+    repo.close()
@@ -0,0 +1,233 @@
+import sqlite3
+import threading
+
+# 地域ごと・日付ごとに1行の天気予報と、それにぶら下がる気温・風・降水確率
+SCHEMA_SQL = '''
+    CREATE TABLE IF NOT EXISTS areas (
+        area_code TEXT PRIMARY KEY,
+        area_name TEXT NOT NULL,
+        fetched_at DATETIME,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    );
+
+    CREATE TABLE IF NOT EXISTS weather_forecasts (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        area_code TEXT NOT NULL REFERENCES areas (area_code),
+        forecast_date TEXT NOT NULL,
+        weather TEXT NOT NULL,
+        weather_code TEXT,
+        updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    );
+
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_weather_forecasts_area_date
+        ON weather_forecasts (area_code, forecast_date);
+
+    CREATE TABLE IF NOT EXISTS temperatures (
+        forecast_id INTEGER PRIMARY KEY REFERENCES weather_forecasts (id),
+        max_temp TEXT,
+        min_temp TEXT
+    );
+
+    CREATE TABLE IF NOT EXISTS wind_conditions (
+        forecast_id INTEGER PRIMARY KEY REFERENCES weather_forecasts (id),
+        wind TEXT NOT NULL
+    );
+
+    CREATE TABLE IF NOT EXISTS rain_probabilities (
+        forecast_id INTEGER NOT NULL REFERENCES weather_forecasts (id),
+        time_define TEXT NOT NULL,
+        probability TEXT NOT NULL,
+        PRIMARY KEY (forecast_id, time_define)
+    );
+'''
+
+# 値が変わった行だけを書き換える（変化のない行はUPDATEされない）
+UPSERT_AREA_SQL = '''
+    INSERT INTO areas (area_code, area_name, fetched_at)
+    VALUES (?, ?, CURRENT_TIMESTAMP)
+    ON CONFLICT (area_code) DO UPDATE SET
+        area_name = excluded.area_name,
+        fetched_at = excluded.fetched_at
+'''
+
+UPSERT_FORECAST_SQL = '''
+    INSERT INTO weather_forecasts (area_code, forecast_date, weather, weather_code)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT (area_code, forecast_date) DO UPDATE SET
+        weather = excluded.weather,
+        weather_code = excluded.weather_code,
+        updated_at = CURRENT_TIMESTAMP
+    WHERE weather IS NOT excluded.weather
+       OR weather_code IS NOT excluded.weather_code
+'''
+
+SELECT_FORECAST_ID_SQL = '''
+    SELECT id FROM weather_forecasts
+    WHERE area_code = ? AND forecast_date = ?
+'''
+
+UPSERT_TEMPERATURE_SQL = '''
+    INSERT INTO temperatures (forecast_id, max_temp, min_temp)
+    VALUES (?, ?, ?)
+    ON CONFLICT (forecast_id) DO UPDATE SET
+        max_temp = excluded.max_temp,
+        min_temp = excluded.min_temp
+    WHERE max_temp IS NOT excluded.max_temp
+       OR min_temp IS NOT excluded.min_temp
+'''
+
+UPSERT_WIND_SQL = '''
+    INSERT INTO wind_conditions (forecast_id, wind)
+    VALUES (?, ?)
+    ON CONFLICT (forecast_id) DO UPDATE SET
+        wind = excluded.wind
+    WHERE wind IS NOT excluded.wind
+'''
+
+UPSERT_RAIN_SQL = '''
+    INSERT INTO rain_probabilities (forecast_id, time_define, probability)
+    VALUES (?, ?, ?)
+    ON CONFLICT (forecast_id, time_define) DO UPDATE SET
+        probability = excluded.probability
+    WHERE probability IS NOT excluded.probability
+'''
+
+SELECT_AREA_SQL = '''
+    SELECT f.forecast_date, f.weather, t.max_temp, t.min_temp, f.weather_code
+    FROM weather_forecasts f
+    LEFT JOIN temperatures t ON t.forecast_id = f.id
+    WHERE f.area_code = ? AND f.forecast_date >= ?
+    ORDER BY f.forecast_date
+'''
+
+# 複数の地域をまとめて読み出す（プレースホルダの数は地域の数に合わせる）
+SELECT_AREAS_FORECASTS_SQL = '''
+    SELECT f.area_code, f.forecast_date, f.weather, t.max_temp, t.min_temp, f.weather_code
+    FROM weather_forecasts f
+    LEFT JOIN temperatures t ON t.forecast_id = f.id
+    WHERE f.area_code IN ({placeholders}) AND f.forecast_date >= ?
+    ORDER BY f.area_code, f.forecast_date
+'''
+
+SELECT_ROWS_SQL = '''
+    SELECT f.id, f.area_code, a.area_name, f.forecast_date, f.weather,
+           t.max_temp, t.min_temp, f.weather_code, a.fetched_at
+    FROM weather_forecasts f
+    JOIN areas a ON a.area_code = f.area_code
+    LEFT JOIN temperatures t ON t.forecast_id = f.id
+'''
+
+SELECT_ALL_AREA_SQL = SELECT_ROWS_SQL + 'WHERE f.area_code = ? ORDER BY f.forecast_date'
+
+SELECT_ALL_SQL = SELECT_ROWS_SQL + 'ORDER BY a.fetched_at DESC, f.forecast_date'
+
+SELECT_FETCHED_AT_SQL = 'SELECT fetched_at FROM areas WHERE area_code = ?'
+
+SELECT_AREAS_SQL = 'SELECT area_code, area_name FROM areas ORDER BY fetched_at'
+
+COUNT_SQL = 'SELECT COUNT(*) FROM weather_forecasts'
+
+
+class WeatherRepository:
+    """天気予報データベースへの接続を1本だけ保持して使い回すリポジトリ
+
+    WALモードにより読み込みと書き込みが互いを待たなくなり、
+    SQL文は固定文字列なので sqlite3 の文キャッシュでプリペアド済みのものが再利用される。
+    Fletのイベントハンドラは別スレッドから呼ばれるため、接続はロックで保護する。
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.RLock()
+        self.con = sqlite3.connect(db_path, timeout=10, check_same_thread=False, cached_statements=64)
+        self.con.execute("PRAGMA journal_mode=WAL")
+        self.con.execute("PRAGMA synchronous=NORMAL")
+        self.init_schema()
+
+    def init_schema(self):
+        """必要なテーブルを作成する"""
+        with self._lock, self.con:
+            self._migrate_legacy_table()
+            self.con.executescript(SCHEMA_SQL)
+
+    def _migrate_legacy_table(self):
+        """地域名で管理していた旧テーブルが残っていれば別名に退避する"""
+        columns = [row[1] for row in self.con.execute("PRAGMA table_info(weather_forecasts)")]
+        if "region_name" in columns:
+            self.con.execute("ALTER TABLE weather_forecasts RENAME TO weather_forecasts_legacy")
+
+    def save_forecasts(self, area_code, area_name, forecasts):
+        """地域の天気予報を1つのトランザクションで保存する
+
+        forecasts は date, weather, weather_code, max_temp, min_temp, wind, pops を
+        キーに持つ辞書のリスト（pops は (time_define, probability) のリスト）。
+        同じ地域・日付の行は上書きし、過去の日付の行はそのまま残す。
+        """
+        self.save_many([(area_code, area_name, forecasts)])
+
+    def save_many(self, items):
+        """複数の地域 [(area_code, area_name, forecasts)] の天気予報を1つのトランザクションで保存する"""
+        with self._lock, self.con:
+            for area_code, area_name, forecasts in items:
+                self._save_forecasts(area_code, area_name, forecasts)
+
+    def _save_forecasts(self, area_code, area_name, forecasts):
+        self.con.execute(UPSERT_AREA_SQL, (area_code, area_name))
+        for forecast in forecasts:
+            self.con.execute(UPSERT_FORECAST_SQL, (
+                area_code, forecast["date"], forecast["weather"], forecast["weather_code"]
+            ))
+            forecast_id = self.con.execute(
+                SELECT_FORECAST_ID_SQL, (area_code, forecast["date"])
+            ).fetchone()[0]
+
+            if forecast.get("max_temp") or forecast.get("min_temp"):
+                self.con.execute(UPSERT_TEMPERATURE_SQL, (
+                    forecast_id, forecast.get("max_temp"), forecast.get("min_temp")
+                ))
+            if forecast.get("wind"):
+                self.con.execute(UPSERT_WIND_SQL, (forecast_id, forecast["wind"]))
+            self.con.executemany(UPSERT_RAIN_SQL, [
+                (forecast_id, time_define, probability)
+                for time_define, probability in forecast.get("pops", [])
+            ])
+
+    def get_forecasts(self, area_code, since=""):
+        """地域の天気予報（since 以降の日付）を日付順に返す"""
+        with self._lock:
+            return self.con.execute(SELECT_AREA_SQL, (area_code, since)).fetchall()
+
+    def get_forecasts_many(self, area_codes, since=""):
+        """複数の地域の天気予報を1回のクエリで読み出し、地域コードごとの辞書で返す"""
+        sql = SELECT_AREAS_FORECASTS_SQL.format(placeholders=", ".join("?" * len(area_codes)))
+        forecasts = {code: [] for code in area_codes}
+        with self._lock:
+            for area_code, *row in self.con.execute(sql, (*area_codes, since)):
+                forecasts[area_code].append(tuple(row))
+        return forecasts
+
+    def get_rows(self, area_code=None):
+        """保存されている行を返す（デバッグ表示用）"""
+        with self._lock:
+            if area_code:
+                return self.con.execute(SELECT_ALL_AREA_SQL, (area_code,)).fetchall()
+            return self.con.execute(SELECT_ALL_SQL).fetchall()
+
+    def get_fetched_at(self, area_code):
+        """地域の天気予報を最後に保存した日時（UTC、なければNone）を返す"""
+        with self._lock:
+            row = self.con.execute(SELECT_FETCHED_AT_SQL, (area_code,)).fetchone()
+        return row[0] if row else None
+
+    def list_areas(self):
+        """天気予報を保存済みの地域を、取得が古い順に返す"""
+        with self._lock:
+            return self.con.execute(SELECT_AREAS_SQL).fetchall()
+
+    def count(self):
+        with self._lock:
+            return self.con.execute(COUNT_SQL).fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self.con.close()
@@ -0,0 +1,117 @@
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from retry.api import retry_call
+
+# SUUMOへの負荷の上限（1秒あたりのリクエスト数と、同時に待つリクエスト数）
+REQUESTS_PER_SECOND = 2
+MAX_IN_FLIGHT = 4
+TIMEOUT = 10
+# 一時的なエラーのときのリトライ（元の load_page と同じ設定）
+TRIES = 3
+DELAY = 10
+BACKOFF = 2
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+
+class TokenBucket:
+    """トークンバケット方式のレート制限（複数スレッドで共有できる）
+
+    rate 個/秒でトークンが貯まり、最大 burst 個まで連続で取り出せる。
+    トークンは先に予約してからロックの外で待つので、待っている間も他のスレッドは順番を取れる。
+    """
+
+    def __init__(self, rate=REQUESTS_PER_SECOND, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
+
+
+class SuumoClient:
+    """SUUMOの一覧ページを、レート制限を守りながら並行して取得する
+
+    同時に max_in_flight 件までのリクエストを別スレッドで待ち、
+    取得できたページから順に呼び出し元へ返すので、解析やデータベースへの書き込みの間も通信が進む。
+    limiter を渡すと、複数の市のクロールで同じレート制限を共有できる。
+    """
+
+    def __init__(self, rate=REQUESTS_PER_SECOND, max_in_flight=MAX_IN_FLIGHT, limiter=None, headers=HEADERS):
+        self.limiter = limiter or TokenBucket(rate)
+        self.max_in_flight = max_in_flight
+        self.session = requests.Session()
+        self.session.headers.update(headers)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_in_flight)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="suumo-fetch")
+
+    def _get(self, url):
+        # リトライのたびにトークンを取るので、やり直しもレート制限の内側に収まる
+        self.limiter.acquire()
+        try:
+            response = self.session.get(url, timeout=TIMEOUT)
+            response.raise_for_status()
+            return response.content
+        except requests.exceptions.RequestException as e:
+            logging.error(f"ページ読み込みエラー: {e}")
+            raise
+
+    def fetch(self, url):
+        """1ページのHTML（バイト列）を返す"""
+        return retry_call(self._get, fargs=[url], tries=TRIES, delay=DELAY, backoff=BACKOFF)
+
+    def fetch_many(self, urls):
+        """URLの順に (URL, HTML) を返すイテレーター
+
+        呼び出した時点で最初のリクエストを送り始める。先読みは max_in_flight の2倍までにして、
+        取得済みのページがメモリに溜まりすぎないようにする。
+        取得に失敗したページは HTML の代わりに例外を返す。
+        """
+        urls = iter(urls)
+        pending = deque()
+        for url in urls:
+            pending.append((url, self._executor.submit(self.fetch, url)))
+            if len(pending) >= self.max_in_flight * 2:
+                break
+        return self._results(urls, pending)
+
+    def _results(self, urls, pending):
+        while pending:
+            url, future = pending.popleft()
+            next_url = next(urls, None)
+            if next_url is not None:
+                pending.append((next_url, self._executor.submit(self.fetch, next_url)))
+            try:
+                yield url, future.result()
+            except Exception as e:
+                yield url, e
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,277 @@
+import argparse
+import logging
+import sqlite3
+from contextlib import closing
+from datetime import datetime, timedelta
+
+# 一覧ページの1部屋から取り出す16項目（この順にタプルで渡す）
+FIELDS = (
+    'category', 'building_name', 'address',
+    'nearest_station1', 'nearest_station2', 'nearest_station3', 'building_age',
+    'total_floors', 'room_floor', 'rent', 'management_fee',
+    'deposit', 'gratuity', 'layout', 'area', 'url',
+)
+
+SCHEMA_SQL = '''
+CREATE TABLE IF NOT EXISTS properties (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    scrape_date TEXT,
+    category TEXT,
+    building_name TEXT,
+    address TEXT,
+    nearest_station1 TEXT,
+    nearest_station2 TEXT,
+    nearest_station3 TEXT,
+    building_age TEXT,
+    total_floors TEXT,
+    room_floor TEXT,
+    rent TEXT,
+    management_fee TEXT,
+    deposit TEXT,
+    gratuity TEXT,
+    layout TEXT,
+    area TEXT,
+    url TEXT,
+    page_number INTEGER
+)
+'''
+
+INSERT_SQL = '''
+INSERT INTO properties (
+    scrape_date, {fields}, page_number
+) VALUES ({placeholders})
+'''.format(fields=', '.join(FIELDS), placeholders=', '.join('?' * (len(FIELDS) + 2)))
+
+# url が同じ部屋を、いちばん新しく取得した1行だけ残して消す（url が '不明' の部屋は対象外）。
+# 保存済みのデータを書き換えるので、dedupe_properties() で明示的に実行したときだけ使う
+DEDUPLICATE_URLS_SQL = '''
+DELETE FROM properties
+WHERE url != '不明' AND id NOT IN (SELECT MAX(id) FROM properties GROUP BY url)
+'''
+
+# クロールの進捗（crawl は検索URL）。ページの物件と同じトランザクションで1行ずつ書くので、
+# 途中で止まっても「書き込み済みのページ」と「終わったページ」が食い違わない。
+# done_at が NULL の行は、worker が claimed_at に取得を始めたページ（まだ終わっていない）
+CRAWL_SCHEMA_SQL = '''
+CREATE TABLE IF NOT EXISTS crawl_pages (
+    crawl TEXT NOT NULL,
+    page INTEGER NOT NULL,
+    buildings INTEGER,
+    properties INTEGER,
+    done_at TEXT,
+    worker TEXT,
+    claimed_at TEXT,
+    PRIMARY KEY (crawl, page)
+) WITHOUT ROWID
+'''
+
+# クロールごとに、保存した部屋のURL（ページの物件と同じトランザクションで書く）
+CRAWL_URLS_SCHEMA_SQL = '''
+CREATE TABLE IF NOT EXISTS crawl_urls (
+    crawl TEXT NOT NULL,
+    url TEXT NOT NULL,
+    page INTEGER,
+    PRIMARY KEY (crawl, url)
+) WITHOUT ROWID
+'''
+
+MARK_URL_SQL = 'INSERT OR IGNORE INTO crawl_urls (crawl, url, page) VALUES (?, ?, ?)'
+
+SELECT_SEEN_URLS_SQL = 'SELECT url FROM crawl_urls WHERE crawl = ?'
+
+DELETE_CRAWL_URLS_SQL = 'DELETE FROM crawl_urls WHERE crawl = ?'
+
+# 取得を始めたまま、この秒数を過ぎても終わらないページは、他のワーカーが取り直せる
+CLAIM_LEASE = 600
+
+MARK_PAGE_SQL = 'INSERT OR REPLACE INTO crawl_pages (crawl, page, buildings, properties, done_at) VALUES (?, ?, ?, ?, ?)'
+
+# まだ誰も取っていないか、終わっておらず期限の切れたページだけを取る
+CLAIM_PAGE_SQL = '''
+INSERT INTO crawl_pages (crawl, page, worker, claimed_at) VALUES (?, ?, ?, ?)
+ON CONFLICT (crawl, page) DO UPDATE SET worker = excluded.worker, claimed_at = excluded.claimed_at
+WHERE crawl_pages.done_at IS NULL
+  AND (crawl_pages.worker = excluded.worker OR crawl_pages.claimed_at IS NULL OR crawl_pages.claimed_at < ?)
+'''
+
+RELEASE_PAGE_SQL = 'DELETE FROM crawl_pages WHERE crawl = ? AND page = ? AND worker = ? AND done_at IS NULL'
+
+SELECT_DONE_PAGES_SQL = 'SELECT page FROM crawl_pages WHERE crawl = ? AND done_at IS NOT NULL'
+
+SELECT_CRAWL_STATS_SQL = '''
+SELECT COUNT(*), COALESCE(SUM(buildings), 0), COALESCE(SUM(properties), 0)
+FROM crawl_pages WHERE crawl = ? AND done_at IS NOT NULL
+'''
+
+DELETE_CRAWL_SQL = 'DELETE FROM crawl_pages WHERE crawl = ?'
+
+
+def _now(offset=0):
+    return (datetime.now() + timedelta(seconds=offset)).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def init_crawl_state(conn):
+    conn.execute(CRAWL_SCHEMA_SQL)
+    conn.execute(CRAWL_URLS_SCHEMA_SQL)
+    # worker と claimed_at がなかった頃のテーブルには列を足す
+    columns = {row[1] for row in conn.execute('PRAGMA table_info(crawl_pages)')}
+    for column in ('worker', 'claimed_at'):
+        if column not in columns:
+            conn.execute(f'ALTER TABLE crawl_pages ADD COLUMN {column} TEXT')
+
+
+def dedupe_properties(conn):
+    """properties で url が重複した部屋を、いちばん新しい行だけ残して消し、消した行数を返す"""
+    with conn:
+        return conn.execute(DEDUPLICATE_URLS_SQL).rowcount
+
+
+def mark_page_done(conn, crawl, page, buildings, properties):
+    """ページを終わったことにする（コミットはしないので、物件の書き込みと一緒にコミットする）"""
+    conn.execute(MARK_PAGE_SQL, (crawl, page, buildings, properties, _now()))
+
+
+def mark_url_seen(conn, crawl, url, page):
+    """部屋のURLを保存済みとして記録する（コミットはしないので、物件の書き込みと一緒にコミットする）"""
+    conn.execute(MARK_URL_SQL, (crawl, url, page))
+
+
+def load_seen_urls(conn, crawl):
+    """そのクロールで保存済みの部屋のURLの集合を返す"""
+    return {url for (url,) in conn.execute(SELECT_SEEN_URLS_SQL, (crawl,))}
+
+
+def claim_page(conn, crawl, page, worker, lease=CLAIM_LEASE):
+    """ページの取得を始めたことを記録してコミットする
+
+    終わったページや、他のワーカーが lease 秒以内に取ったページなら False を返すので、
+    同じデータベースを使う複数のワーカーで、残りのページを重ならないように分けられる。
+    """
+    with conn:
+        cursor = conn.execute(CLAIM_PAGE_SQL, (crawl, page, worker, _now(), _now(-lease)))
+    return cursor.rowcount == 1
+
+
+def release_page(conn, crawl, page, worker):
+    """取得に失敗したページを手放して、他のワーカーがすぐに取り直せるようにする"""
+    with conn:
+        conn.execute(RELEASE_PAGE_SQL, (crawl, page, worker))
+
+
+def load_crawl_state(conn, crawl):
+    """終わったページの集合と、それまでの統計を返す（まだ何もなければNone）"""
+    done_pages = {page for (page,) in conn.execute(SELECT_DONE_PAGES_SQL, (crawl,))}
+    if not done_pages:
+        return None
+    pages, buildings, properties = conn.execute(SELECT_CRAWL_STATS_SQL, (crawl,)).fetchone()
+    return {
+        'done_pages': done_pages,
+        'stats': {'pages': pages, 'total_buildings': buildings, 'total_properties': properties},
+    }
+
+
+def reset_crawl(conn, crawl):
+    """進捗を消して、次は1ページ目からやり直す"""
+    with conn:
+        conn.execute(DELETE_CRAWL_SQL, (crawl,))
+        conn.execute(DELETE_CRAWL_URLS_SQL, (crawl,))
+
+
+class PropertyStore:
+    """スクレイピングした部屋を、ページ単位でまとめてデータベースに書き込む
+
+    add_page() では行を溜めるだけで、pages_per_commit ページごとに
+    1回の executemany と1回のコミットで書き込む。待ち時間は入れない（レート制限はHTTPだけにかける）。
+    crawl を渡したページは、同じコミットで crawl_pages にも終わったことを記録する。
+    verbose=True のときだけ、部屋ごとに1行の概要を表示する。
+    """
+
+    def __init__(self, db_path, pages_per_commit=1, verbose=False):
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute(SCHEMA_SQL)
+        init_crawl_state(self.conn)
+        self.conn.commit()
+        self.pages_per_commit = pages_per_commit
+        self.verbose = verbose
+        self.written = 0
+        self._rows = []
+        self._done = []
+        self._pages = 0
+
+    def add_page(self, page, rooms, crawl=None, buildings=None):
+        """1ページ分の部屋（16項目のタプル／リスト）を追加する
+
+        項目の数が違う部屋は、足りない項目を '不明' で補うか余分な項目を切り捨てて16項目にする。
+        """
+        scrape_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        for room in rooms:
+            if len(room) != len(FIELDS):
+                logging.warning(f"{page}ページ目: 項目数が{len(room)}個の部屋を{len(FIELDS)}項目に揃えました: {room}")
+                room = (tuple(room) + ('不明',) * len(FIELDS))[:len(FIELDS)]
+            self._rows.append((scrape_date, *room, page))
+        if crawl is not None:
+            self._done.append((crawl, page, buildings, len(rooms), scrape_date))
+        if self.verbose:
+            for room in rooms:
+                print(f"{page}ページ: {room[1]} {room[8]} {room[9]} {room[13]} {room[14]}")
+        self._pages += 1
+        if self._pages >= self.pages_per_commit:
+            self.flush()
+
+    def flush(self):
+        """溜まっている行とページの進捗を1つのトランザクションで書き込む
+
+        書き込みに失敗したときはロールバックして、溜まっていた行を捨ててから例外を送出する
+        （失敗した行が残って、以降の flush() や close() まで失敗し続けないようにする）。
+        """
+        try:
+            if self._rows or self._done:
+                with self.conn:
+                    self.conn.executemany(INSERT_SQL, self._rows)
+                    self.conn.executemany(MARK_PAGE_SQL, self._done)
+                self.written += len(self._rows)
+        except sqlite3.Error as e:
+            logging.error(f"データベースへの書き込みに失敗したので{len(self._rows)}件を破棄: {e}")
+            raise
+        finally:
+            self._rows = []
+            self._done = []
+            self._pages = 0
+
+    def crawl_state(self, crawl):
+        return load_crawl_state(self.conn, crawl)
+
+    def reset_crawl(self, crawl):
+        self.flush()
+        reset_crawl(self.conn, crawl)
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def main():
+    # 重複した部屋の削除は保存済みのデータを書き換えるので、必要なときに手で実行する
+    #   python suumo_db.py --dedupe suumo_properties.db honjo_properties.db
+    parser = argparse.ArgumentParser(description="物件データベースのメンテナンス")
+    parser.add_argument("databases", nargs="+", help="物件のデータベース")
+    parser.add_argument("--dedupe", action="store_true", help="url が重複した部屋を、いちばん新しい行だけ残して消す")
+    args = parser.parse_args()
+    if not args.dedupe:
+        parser.error("実行する処理を指定してください（--dedupe）")
+
+    for db_path in args.databases:
+        with closing(sqlite3.connect(db_path)) as conn:
+            print(f"{db_path}: 重複した {dedupe_properties(conn)} 件を削除")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+import argparse
+import logging
+import statistics
+import time
+import urllib.parse
+from collections import namedtuple
+from functools import lru_cache
+
+from suumo_db import FIELDS
+
+# SUUMOの一覧ページの解析
+# 1部屋ごとに suumo_db.FIELDS の16項目をタプルで取り出す。バックエンドは
+#   'lxml' lxml で組み立てた木を、クラス名を比べながらたどって取り出す（既定）
+#   'bs4'  これまでの BeautifulSoup(html.parser) による取り出し
+# どちらも同じ結果を返す（取れなかった項目は '不明'）。
+#
+#   python suumo_parser.py page1.html page2.html ...   保存したページで両方を比べる
+BACKENDS = ('lxml', 'bs4')
+DEFAULT_BACKEND = 'lxml'
+UNKNOWN = '不明'
+
+# total_pages: ページネーションから読んだ総ページ数、buildings: 建物数、rooms: 部屋のタプルのリスト
+ParsedPage = namedtuple('ParsedPage', ['total_pages', 'buildings', 'rooms'])
+
+# 部屋の行の何番目のセルから、どのクラスの項目を取り出すか（2番目は階、8番目は詳細ページのURL）
+ROOM_CELLS = {
+    3: ('cassetteitem_other-emphasis ui-text--bold', 'cassetteitem_price cassetteitem_price--administration'),
+    4: ('cassetteitem_price cassetteitem_price--deposit', 'cassetteitem_price cassetteitem_price--gratuity'),
+    5: ('cassetteitem_madori', 'cassetteitem_menseki'),
+}
+
+
+def parse_page(html, base_url, backend=DEFAULT_BACKEND):
+    """一覧ページのHTML（バイト列）を解析して ParsedPage を返す
+
+    プロセスプールからも呼べるよう、モジュールの関数として引数だけで完結させている。
+    """
+    if backend == 'lxml':
+        return _parse_lxml(html, base_url)
+    if backend == 'bs4':
+        return _parse_bs4(html, base_url)
+    raise ValueError(f"解析のバックエンドは {BACKENDS} のいずれか: {backend}")
+
+
+def _matches(value, name):
+    # BeautifulSoup の class_= と同じ判定。空白を含む名前は class属性全体と、含まない名前はクラスの1つと比べる
+    if ' ' in name:
+        return ' '.join(value.split()) == name
+    return name in value.split()
+
+
+def _find_all(element, name, first=False):
+    found = []
+    for descendant in element.iterdescendants():
+        value = descendant.get('class')
+        # 空白を含まない名前は、部分文字列として含まないものを分割せずに飛ばす
+        # （空白を含む名前は属性の空白の入り方が違っても一致するので、先に絞り込まない）
+        if value and (' ' in name or name in value) and _matches(value, name):
+            if first:
+                return descendant
+            found.append(descendant)
+    return None if first else found
+
+
+def _find(element, name):
+    return _find_all(element, name, first=True)
+
+
+def _text(element):
+    return ''.join(element.itertext())
+
+
+def _room(data_home, data_room):
+    """建物と部屋の項目をつないで、FIELDS と同じ16項目のタプルにする（足りなければ '不明' で補う）"""
+    room = data_home + data_room
+    if len(room) != len(FIELDS):
+        room = (room + [UNKNOWN] * len(FIELDS))[:len(FIELDS)]
+    return tuple(room)
+
+
+@lru_cache(maxsize=None)
+def _html_parser():
+    """lxml は使うときに読み込む（パーサーは使い回す）"""
+    from lxml import etree
+
+    return etree.HTMLParser(remove_comments=True, remove_pis=True), etree.fromstring
+
+
+def _parse_lxml(html, base_url):
+    parser, fromstring = _html_parser()
+    if isinstance(html, bytes):
+        # SUUMOはUTF-8。meta で文字コードを宣言していないページでも文字化けしないよう先にデコードする
+        try:
+            html = html.decode('utf-8')
+        except UnicodeDecodeError:
+            pass
+    root = fromstring(html, parser) if html else None
+    if root is None:
+        return ParsedPage(1, 0, [])
+
+    # 文書を1回たどって、ページネーションと建物を取り出す
+    pagination = None
+    buildings = []
+    for element in root.iter():
+        value = element.get('class')
+        if not value:
+            continue
+        if pagination is None and _matches(value, 'pagination pagination_set-nav'):
+            pagination = element
+        if 'cassetteitem' in value.split():
+            buildings.append(element)
+
+    total_pages = 1
+    if pagination is not None:
+        pages = list(pagination.iterdescendants('a'))
+        if pages:
+            try:
+                total_pages = int(_text(pages[-2]))
+            except (IndexError, ValueError) as e:
+                logging.error(f"総ページ数の取得に失敗: {e}")
+
+    rooms = []
+    for building in buildings:
+        data_home = []
+        for name in ('ui-pct ui-pct--util1', 'cassetteitem_content-title', 'cassetteitem_detail-col1'):
+            element = _find(building, name)
+            data_home.append(_text(element) if element is not None else UNKNOWN)
+
+        column = _find(building, 'cassetteitem_detail-col2')
+        stations = _find_all(column, 'cassetteitem_detail-text')[:3] if column is not None else []
+        data_home.extend(_text(station) for station in stations)
+        data_home.extend([UNKNOWN] * (3 - len(stations)))
+
+        column = _find(building, 'cassetteitem_detail-col3')
+        building_info = list(column.iterdescendants('div')) if column is not None else []
+        if len(building_info) >= 2:
+            data_home.extend([_text(building_info[0]), _text(building_info[1])])
+        else:
+            data_home.extend([UNKNOWN, UNKNOWN])
+
+        table = _find(building, 'cassetteitem_other')
+        if table is None:
+            continue
+        for room in _find_all(table, 'js-cassette_link'):
+            data_room = []
+            for id_, td in enumerate(room.iterdescendants('td')):
+                if id_ == 2:
+                    data_room.append(_text(td).strip())
+                elif id_ in ROOM_CELLS:
+                    # セルの中で1項目でも取れなければ、そのセルの項目はすべて '不明' になる（bs4 版と同じ）
+                    found = [_find(td, name) for name in ROOM_CELLS[id_]]
+                    if all(element is not None for element in found):
+                        data_room.extend(_text(element) for element in found)
+                    else:
+                        data_room.extend([UNKNOWN] * len(ROOM_CELLS[id_]))
+                elif id_ == 8:
+                    link = _find(td, 'js-cassette_link_href cassetteitem_other-linktext')
+                    if link is not None:
+                        data_room.append(urllib.parse.urljoin(base_url, link.get('href')))
+                    else:
+                        data_room.append(UNKNOWN)
+            rooms.append(_room(data_home, data_room))
+
+    return ParsedPage(total_pages, len(buildings), rooms)
+
+
+def _parse_bs4(html, base_url):
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, 'html.parser')
+
+    try:
+        total_pages = 1
+        pagination = soup.find(class_='pagination pagination_set-nav')
+        if pagination:
+            pages = pagination.find_all('a')
+            if pages:
+                # ページネーションの最後から2番目の要素が最終ページ
+                # （最後の要素は「次へ」ボタン）
+                total_pages = int(pages[-2].text)
+    except Exception as e:
+        logging.error(f"総ページ数の取得に失敗: {e}")
+        total_pages = 1
+
+    mother = soup.find_all(class_='cassetteitem')
+    rooms = []
+    for child in mother:
+        data_home = []
+
+        try:
+            data_home.append(child.find(class_='ui-pct ui-pct--util1').text)
+        except:
+            data_home.append(UNKNOWN)
+
+        try:
+            data_home.append(child.find(class_='cassetteitem_content-title').text)
+        except:
+            data_home.append(UNKNOWN)
+
+        try:
+            data_home.append(child.find(class_='cassetteitem_detail-col1').text)
+        except:
+            data_home.append(UNKNOWN)
+
+        try:
+            children = child.find(class_='cassetteitem_detail-col2')
+            stations = children.find_all(class_='cassetteitem_detail-text')
+            for grandchild in stations[:3]:
+                data_home.append(grandchild.text)
+            while len(data_home) < 6:
+                data_home.append(UNKNOWN)
+        except:
+            data_home.extend([UNKNOWN, UNKNOWN, UNKNOWN])
+
+        try:
+            children = child.find(class_='cassetteitem_detail-col3')
+            building_info = children.find_all('div')
+            data_home.extend([building_info[0].text, building_info[1].text])
+        except:
+            data_home.extend([UNKNOWN, UNKNOWN])
+
+        other = child.find(class_='cassetteitem_other')
+        if other is None:
+            continue
+        for room in other.find_all(class_='js-cassette_link'):
+            data_room = []
+
+            room_tds = room.find_all('td')
+            for id_, grandchild in enumerate(room_tds):
+                try:
+                    if id_ == 2:
+                        data_room.append(grandchild.text.strip())
+
+                    elif id_ == 3:
+                        rent = grandchild.find(class_='cassetteitem_other-emphasis ui-text--bold').text
+                        management_fee = grandchild.find(class_='cassetteitem_price cassetteitem_price--administration').text
+                        data_room.append(rent)
+                        data_room.append(management_fee)
+
+                    elif id_ == 4:
+                        deposit = grandchild.find(class_='cassetteitem_price cassetteitem_price--deposit').text
+                        gratuity = grandchild.find(class_='cassetteitem_price cassetteitem_price--gratuity').text
+                        data_room.append(deposit)
+                        data_room.append(gratuity)
+
+                    elif id_ == 5:
+                        layout = grandchild.find(class_='cassetteitem_madori').text
+                        area = grandchild.find(class_='cassetteitem_menseki').text
+                        data_room.append(layout)
+                        data_room.append(area)
+
+                    elif id_ == 8:
+                        get_url = grandchild.find(class_='js-cassette_link_href cassetteitem_other-linktext').get('href')
+                        data_room.append(urllib.parse.urljoin(base_url, get_url))
+
+                except Exception:
+                    # 取り出すはずだった項目の数だけ '不明' にする
+                    data_room.extend([UNKNOWN] * len(ROOM_CELLS.get(id_, (UNKNOWN,))))
+
+            rooms.append(_room(data_home, data_room))
+
+    return ParsedPage(total_pages, len(mother), rooms)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="保存したSUUMOの一覧ページで解析のバックエンドを比べる")
+    parser.add_argument("files", nargs="+", help="保存した一覧ページのHTML")
+    parser.add_argument("-n", "--number", type=int, default=20, help="各ページの解析回数")
+    parser.add_argument("--base-url", default="https://suumo.jp/", help="部屋のURLを絶対URLにするときの基準")
+    args = parser.parse_args()
+
+    pages = []
+    for path in args.files:
+        with open(path, "rb") as f:
+            pages.append(f.read())
+
+    results = {}
+    medians = {}
+    for backend in BACKENDS:
+        times = []
+        for _ in range(args.number):
+            start = time.perf_counter()
+            results[backend] = [parse_page(html, args.base_url, backend) for html in pages]
+            times.append((time.perf_counter() - start) / len(pages))
+        medians[backend] = statistics.median(times)
+        rooms = sum(len(page.rooms) for page in results[backend])
+        print(f"{backend:<5} {medians[backend] * 1000:>9.3f} ms/ページ  {rooms} 部屋")
+
+    for backend in BACKENDS[1:]:
+        print(f"{BACKENDS[0]} は {backend} の {medians[backend] / medians[BACKENDS[0]]:.1f} 倍速い")
+    if any(results[backend] != results[BACKENDS[0]] for backend in BACKENDS[1:]):
+        print("注意: バックエンドによって解析結果が違います")
+        return 1
+    print("解析結果はすべて一致")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
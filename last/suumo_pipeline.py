@@ -0,0 +1,224 @@
+import argparse
+import itertools
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import closing
+from concurrent.futures import ProcessPoolExecutor
+
+from suumo_client import MAX_IN_FLIGHT, REQUESTS_PER_SECOND, SuumoClient
+from suumo_db import PropertyStore, init_crawl_state, load_crawl_state, reset_crawl
+from suumo_parser import BACKENDS, DEFAULT_BACKEND, parse_page
+
+# 複数の市をまとめてスクレイピングするパイプライン
+#   取得（スレッド、レート制限は全市で共有）→ 解析（プロセスプール）→ 書き込み（1つのスレッド）
+# 段の間は上限付きのキューでつなぎ、後ろの段が詰まったら前の段が待つので、メモリは一定以上に増えない。
+#
+#   python suumo_pipeline.py                   すべての市
+#   python suumo_pipeline.py 船橋市 --rate 1   市を選んで、1秒に1リクエストで
+#   python suumo_pipeline.py --resume          中断したところから続ける
+CITIES = {
+    '船橋市': (
+        'https://suumo.jp/jj/chintai/ichiran/FR301FC001/?ar=030&bs=040&pc=30&smk=&po1=25&po2=99&shkr1=03&shkr2=03&shkr3=03&shkr4=03&sc=12204&ta=12&cb=0.0&ct=9999999&md=01&et=9999999&mb=0&mt=9999999&cn=9999999&fw2=',
+        'suumo_properties.db',
+    ),
+    '本庄市': (
+        'https://suumo.jp/jj/chintai/ichiran/FR301FC001/?ar=030&bs=040&ta=11&sc=11211&cb=0.0&ct=9999999&et=9999999&cn=9999999&mb=0&mt=9999999&shkr1=03&shkr2=03&shkr3=03&shkr4=03&fw2=&srch_navi=1',
+        'honjo_properties.db',
+    ),
+}
+
+# 解析を待っているページと、書き込みを待っているページの上限
+PARSE_BACKLOG = 8
+WRITE_BACKLOG = 16
+# 書き込みがこの回数続けて失敗した市は、それ以降のページを取得しない
+MAX_WRITE_ERRORS = 3
+
+
+class PropertyWriter(threading.Thread):
+    """キューから受け取ったページを、市ごとのデータベースに書き込むスレッド
+
+    SQLiteへの書き込みはこのスレッドだけが行う（接続もこのスレッドで開く）。
+    書き込みが MAX_WRITE_ERRORS 回続けて失敗した市は failed に入れて、以降のページを捨てる。
+    """
+
+    def __init__(self, cities, pages_per_commit=1, maxsize=WRITE_BACKLOG):
+        super().__init__(name="suumo-writer", daemon=True)
+        self.cities = cities
+        self.pages_per_commit = pages_per_commit
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.written = {}
+        self.failed = {}  # 市 -> 最後の例外
+
+    def put(self, city, page, parsed):
+        # キューがいっぱいなら空くまで待つ（これが前の段へのバックプレッシャーになる）
+        while True:
+            if not self.is_alive():
+                raise RuntimeError("書き込みスレッドが止まっています")
+            try:
+                self.queue.put((city, page, parsed), timeout=1)
+                return
+            except queue.Full:
+                pass
+
+    def close(self):
+        if self.is_alive():
+            self.queue.put(None)
+        self.join()
+
+    def run(self):
+        stores = {}
+        errors = {city: 0 for city in self.cities}
+        try:
+            for city, (_, db_path) in self.cities.items():
+                stores[city] = PropertyStore(db_path, pages_per_commit=self.pages_per_commit)
+            while True:
+                item = self.queue.get()
+                if item is None:
+                    break
+                city, page, parsed = item
+                if city in self.failed:
+                    continue
+                try:
+                    # ページの物件と進捗を同じコミットで書く
+                    stores[city].add_page(page, parsed.rooms, crawl=self.cities[city][0], buildings=parsed.buildings)
+                    errors[city] = 0
+                except Exception as e:
+                    logging.error(f"{city} {page}ページ目の書き込みに失敗: {e}")
+                    errors[city] += 1
+                    if errors[city] >= MAX_WRITE_ERRORS:
+                        logging.error(f"{city} は書き込みが{errors[city]}回続けて失敗したので止めます")
+                        self.failed[city] = e
+        finally:
+            # 1つの市で閉じるのに失敗しても、他の市は閉じて保存件数を残す
+            for city, store in stores.items():
+                try:
+                    store.close()
+                except Exception as e:
+                    logging.error(f"{city} のデータベースを閉じるときに失敗: {e}")
+                    self.failed.setdefault(city, e)
+                self.written[city] = store.written
+
+
+def crawl(cities=None, rate=REQUESTS_PER_SECOND, max_in_flight=MAX_IN_FLIGHT,
+          workers=None, backend=DEFAULT_BACKEND, pages_per_commit=1, resume=False):
+    """市（CITIES のキー）のリストをまとめてスクレイピングし、市ごとの保存件数を返す
+
+    resume=True のときは、データベースの crawl_pages で終わっているページを飛ばして続きから取得する。
+    """
+    cities = {name: CITIES[name] for name in (cities or CITIES)}
+    started = time.time()
+
+    done_pages = {}
+    for city, (url, db_path) in cities.items():
+        with closing(sqlite3.connect(db_path)) as conn:
+            init_crawl_state(conn)
+            state = load_crawl_state(conn, url) if resume else None
+            if not resume:
+                reset_crawl(conn, url)
+        done_pages[city] = state['done_pages'] if state else set()
+        if state:
+            print(f"{city}: 前回の続きから再開（{state['stats']['pages']}ページ、{state['stats']['total_properties']}件は保存済み）")
+
+    client = SuumoClient(rate=rate, max_in_flight=max_in_flight)
+    writer = PropertyWriter(cities, pages_per_commit=pages_per_commit)
+    writer.start()
+
+    stats = {city: [0, 0, 0] for city in cities}  # 市 -> [ページ数, 建物数, 物件数]
+    total_pages = {}
+
+    def done(city, page, parsed):
+        if city in writer.failed:
+            return
+        stats[city][0] += 1
+        stats[city][1] += parsed.buildings
+        stats[city][2] += len(parsed.rooms)
+        writer.put(city, page, parsed)
+        print(f'{city} {page}/{total_pages[city]}ページ: 建物数 {parsed.buildings} 物件数 {len(parsed.rooms)}')
+        logging.info(f'{city} ページ {page} スクレイピング完了 (建物数: {parsed.buildings}, 物件数: {len(parsed.rooms)})')
+
+    try:
+        # 1ページ目で総ページ数を調べる
+        jobs = []
+        for city, (url, _) in cities.items():
+            first = parse_page(client.fetch(url), url, backend)
+            total_pages[city] = first.total_pages
+            if 1 not in done_pages[city]:
+                done(city, 1, first)
+            jobs.append([
+                (city, page, f"{url}&page={page}")
+                for page in range(2, first.total_pages + 1) if page not in done_pages[city]
+            ])
+
+        # 市を交互に並べて、どの市も同じペースで進める
+        jobs = [job for group in itertools.zip_longest(*jobs) for job in group if job is not None]
+        by_url = {url: (city, page) for city, page, url in jobs}
+        base_urls = {city: url for city, (url, _) in cities.items()}
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = deque()
+
+            def collect():
+                city, page, future = pending.popleft()
+                try:
+                    parsed = future.result()
+                except Exception as e:
+                    logging.error(f"{city} {page}ページ目の解析に失敗: {e}")
+                    return
+                done(city, page, parsed)
+
+            # 書き込みが止まった市のページはこれ以上取得しない
+            for url, html in client.fetch_many(url for city, _, url in jobs if city not in writer.failed):
+                city, page = by_url[url]
+                if isinstance(html, Exception):
+                    logging.error(f"{city} {page}ページ目の取得に失敗したのでスキップ: {url} ({html})")
+                    continue
+                pending.append((city, page, pool.submit(parse_page, html, base_urls[city], backend)))
+                # 解析待ちが溜まったら、古いものから結果を受け取って書き込みに回す
+                while len(pending) >= PARSE_BACKLOG:
+                    collect()
+            while pending:
+                collect()
+    finally:
+        writer.close()
+        client.close()
+
+    elapsed = time.time() - started
+    print('\n=== 最終統計 ===')
+    for city, (pages, buildings, rooms) in stats.items():
+        print(f'{city}: {pages}ページ 建物数 {buildings} 物件数 {rooms} 保存 {writer.written.get(city, 0)}')
+        if city in writer.failed:
+            print(f'  {city} は書き込みに失敗したので途中で止めました: {writer.failed[city]}')
+    print(f'総経過時間: {elapsed:.1f}秒')
+    return writer.written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SUUMOの物件を複数の市まとめてスクレイピングする")
+    parser.add_argument("cities", nargs="*", help=f"市（{'、'.join(CITIES)}。省略時はすべて）")
+    parser.add_argument("--rate", type=float, default=REQUESTS_PER_SECOND, help="1秒あたりのリクエスト数")
+    parser.add_argument("--in-flight", type=int, default=MAX_IN_FLIGHT, help="同時に待つリクエスト数")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="解析のプロセス数")
+    parser.add_argument("--backend", choices=BACKENDS, default=DEFAULT_BACKEND, help="解析のバックエンド")
+    parser.add_argument("--pages-per-commit", type=int, default=1, help="何ページごとにコミットするか")
+    parser.add_argument("--resume", action="store_true", help="前回の続きから取得する")
+    args = parser.parse_args()
+    unknown = [city for city in args.cities if city not in CITIES]
+    if unknown:
+        parser.error(f"市が登録されていません: {'、'.join(unknown)}")
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        filename='scraping.log'
+    )
+    crawl(args.cities, rate=args.rate, max_in_flight=args.in_flight, workers=args.workers,
+          backend=args.backend, pages_per_commit=args.pages_per_commit, resume=args.resume)
+
+
+if __name__ == "__main__":
+    main()